@@ -0,0 +1,172 @@
+"""
+Benchmark dos nós calcula_ranking_bacias, pre_processa_input e prioriza_bacias sobre concessões sintéticas
+(objects/utils/sintetico).
+
+Para cada cenário, mede o tempo de cada nó (o menor entre as repetições) e o pico de memória alocada durante o nó
+(tracemalloc, em uma execução à parte para não distorcer o tempo). O resultado é gravado em JSON em
+benchmarks/resultados e comparado com a baseline do cenário em benchmarks/baselines, se houver: um nó mais lento ou
+com pico de memória maior que a baseline além da tolerância é uma regressão, e o comando termina com código 1.
+
+Uso (na raiz do projeto):
+
+    python -m benchmarks.executa                                # cenários padrão, comparando com as baselines
+    python -m benchmarks.executa --cenarios grande              # 1M de linhas
+    python -m benchmarks.executa --cenarios medio --grava-baseline
+
+As baselines dependem da máquina: grave-as novamente ao trocar de ambiente
+"""
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from priorizacao_capex.objects.utils.sintetico import gera_concessao
+from priorizacao_capex.pipelines.data_processing.nodes import calcula_ranking_bacias, pre_processa_input
+from priorizacao_capex.pipelines.model_priorization.nodes import prioriza_bacias
+
+logger = logging.getLogger("benchmarks")
+
+DIRETORIO = Path(__file__).parent
+DIRETORIO_BASELINES = DIRETORIO / "baselines"
+DIRETORIO_RESULTADOS = DIRETORIO / "resultados"
+
+# Parâmetros do gera_concessao de cada cenário
+CENARIOS = {
+    "pequeno": {"n_bacias": 300, "n_municipios": 20, "n_blocos": 3, "n_anos": 10, "profundidade_predec": 1},
+    "cadeias": {"n_bacias": 1000, "n_municipios": 40, "n_blocos": 4, "n_anos": 15, "profundidade_predec": 5},
+    "medio": {"n_bacias": 3000, "n_municipios": 100, "n_blocos": 8, "n_anos": 20, "profundidade_predec": 2},
+    "grande": {"n_bacias": 33334, "n_municipios": 400, "n_blocos": 20, "n_anos": 30, "profundidade_predec": 2},
+}
+CENARIOS_PADRAO = ["pequeno", "cadeias", "medio"]
+
+# Tolerâncias padrão de regressão (fração acima da baseline) e folga absoluta de tempo, abaixo da qual a diferença é
+# considerada ruído de medição
+TOLERANCIA_TEMPO = 0.25
+TOLERANCIA_MEMORIA = 0.10
+FOLGA_TEMPO_S = 0.02
+
+
+def mede(funcao, argumentos, repeticoes: int) -> tuple:
+    """
+    Executa 'funcao' com cópias dos 'argumentos' (DataFrames copiados fora da medição). Retorna o menor tempo entre as
+    'repeticoes', o pico de memória alocada (MB) e o resultado da última execução
+    """
+    def copias():
+        return [argumento.copy() if isinstance(argumento, pd.DataFrame) else argumento for argumento in argumentos]
+
+    tempos = []
+    for _ in range(repeticoes):
+        entrada = copias()
+        inicio = time.perf_counter()
+        resultado = funcao(*entrada)
+        tempos.append(time.perf_counter() - inicio)
+
+    entrada = copias()
+    tracemalloc.start()
+    try:
+        funcao(*entrada)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return min(tempos), pico / 2**20, resultado
+
+
+def executa_cenario(nome: str, repeticoes: int = 3, seed: int = 0) -> dict:
+    """
+    Gera a concessão do cenário e mede os nós do data_processing e do model_priorization em sequência
+    """
+    parametros_cenario = CENARIOS[nome]
+    input, parametros = gera_concessao(**parametros_cenario, seed=seed)
+    logger.info("Cenário %s: %d linhas", nome, len(input))
+
+    nos = {}
+    tempo, pico, ranking_bacias = mede(calcula_ranking_bacias, [input, parametros], repeticoes)
+    nos["calcula_ranking_bacias"] = {"tempo_s": tempo, "pico_memoria_mb": pico}
+    tempo, pico, input_pre_processado = mede(pre_processa_input, [input, ranking_bacias], repeticoes)
+    nos["pre_processa_input"] = {"tempo_s": tempo, "pico_memoria_mb": pico}
+    tempo, pico, _ = mede(prioriza_bacias, [input_pre_processado, parametros], repeticoes)
+    nos["prioriza_bacias"] = {"tempo_s": tempo, "pico_memoria_mb": pico}
+
+    return {
+        "cenario": nome,
+        "parametros": {**parametros_cenario, "seed": seed},
+        "linhas": len(input),
+        "repeticoes": repeticoes,
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "ambiente": {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+                     "maquina": platform.machine(), "processador": platform.processor()},
+        "nos": nos,
+    }
+
+
+def compara(resultado: dict, baseline: dict, tolerancia_tempo: float = TOLERANCIA_TEMPO, tolerancia_memoria: float = TOLERANCIA_MEMORIA) -> list:
+    """
+    Regressões do 'resultado' em relação à 'baseline' do mesmo cenário, uma mensagem por nó e métrica
+    """
+    if resultado["parametros"] != baseline["parametros"]:
+        raise ValueError(f"A baseline do cenário {resultado['cenario']} foi gravada com outros parâmetros: {baseline['parametros']}")
+
+    regressoes = []
+    for no, medidas in resultado["nos"].items():
+        if no not in baseline["nos"]:
+            continue
+        base = baseline["nos"][no]
+        tempo, tempo_base = medidas["tempo_s"], base["tempo_s"]
+        if tempo > tempo_base * (1 + tolerancia_tempo) and tempo - tempo_base > FOLGA_TEMPO_S:
+            regressoes.append(f"{resultado['cenario']}/{no}: tempo {tempo:.3f}s, baseline {tempo_base:.3f}s (+{tempo / tempo_base - 1:.0%})")
+        pico, pico_base = medidas["pico_memoria_mb"], base["pico_memoria_mb"]
+        if pico > pico_base * (1 + tolerancia_memoria):
+            regressoes.append(f"{resultado['cenario']}/{no}: pico de memória {pico:.1f} MB, baseline {pico_base:.1f} MB (+{pico / pico_base - 1:.0%})")
+    return regressoes
+
+
+def _grava_json(caminho: Path, conteudo: dict) -> None:
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    caminho.write_text(json.dumps(conteudo, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def main(argumentos: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark dos nós do data_processing e do model_priorization")
+    parser.add_argument("--cenarios", nargs="+", choices=list(CENARIOS), default=CENARIOS_PADRAO)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--grava-baseline", action="store_true", help="grava o resultado como a nova baseline do cenário")
+    parser.add_argument("--tolerancia-tempo", type=float, default=TOLERANCIA_TEMPO)
+    parser.add_argument("--tolerancia-memoria", type=float, default=TOLERANCIA_MEMORIA)
+    parser.add_argument("--baselines", type=Path, default=DIRETORIO_BASELINES)
+    parser.add_argument("--resultados", type=Path, default=DIRETORIO_RESULTADOS)
+    args = parser.parse_args(argumentos)
+
+    regressoes = []
+    for nome in args.cenarios:
+        resultado = executa_cenario(nome, args.repeticoes)
+        for no, medidas in resultado["nos"].items():
+            logger.info("  %-24s %8.3f s %10.1f MB", no, medidas["tempo_s"], medidas["pico_memoria_mb"])
+        _grava_json(args.resultados / f"{datetime.now():%Y%m%d_%H%M%S}_{nome}.json", resultado)
+
+        caminho_baseline = args.baselines / f"{nome}.json"
+        if args.grava_baseline:
+            _grava_json(caminho_baseline, resultado)
+            logger.info("Baseline gravada em %s", caminho_baseline)
+        elif caminho_baseline.exists():
+            baseline = json.loads(caminho_baseline.read_text(encoding="utf-8"))
+            regressoes += compara(resultado, baseline, args.tolerancia_tempo, args.tolerancia_memoria)
+        else:
+            logger.warning("Sem baseline para o cenário %s (%s)", nome, caminho_baseline)
+
+    for regressao in regressoes:
+        logger.error("REGRESSÃO %s", regressao)
+    return 1 if regressoes else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("priorizacao_capex").setLevel(logging.WARNING)
+    sys.exit(main())
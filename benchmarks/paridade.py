@@ -0,0 +1,213 @@
+"""
+Paridade entre um motor candidato da simulação do prioriza_bacias e um motor de referência (MOTORES_SIMULACAO, os
+motores de params:simulacao.motor; por padrão, 'arrays' contra 'referencia', a implementação em pandas), sobre
+concessões sintéticas (objects/utils/sintetico).
+
+Os dois motores recebem o mesmo input pré-processado, com o rastro das decisões ligado. O resultado de cada um é
+comparado por bacia e ano, sem arredondar, com a tolerância de meia unidade da última casa decimal que o round_cols
+mantém em cada coluna (DECIMAIS_OUTPUT; as demais colunas precisam ser iguais): uma diferença dentro da tolerância
+muda o output arredondado em no máximo uma unidade. Quando há divergência, o relatório aponta a primeira decisão do
+rastro em que os motores discordam e a primeira bacia-ano divergente (na ordem do ano e do RANK_GLOBAL). Um ranking
+candidato (mesma assinatura do calcula_ranking_bacias) pode ser comparado da mesma forma, por bacia.
+
+Uso (na raiz do projeto):
+
+    python -m benchmarks.paridade                           # motor em arrays contra a referência, seeds 0 a 19
+    python -m benchmarks.paridade --seeds 0 200 --profundidade 3
+"""
+import argparse
+import logging
+import sys
+
+import numpy as np
+import pandas as pd
+from priorizacao_capex.objects.utils.enums import *
+from priorizacao_capex.objects.utils.sintetico import gera_concessao
+from priorizacao_capex.pipelines.data_processing.nodes import calcula_ranking_bacias, pre_processa_input
+from priorizacao_capex.pipelines.model_priorization.nodes import DECIMAIS_OUTPUT, MOTORES_SIMULACAO
+from priorizacao_capex.pipelines.model_priorization.rastro import COLUNAS_RASTRO, RastroDecisoes
+from priorizacao_capex.pipelines.model_priorization.simulador import aplica_anos
+
+logger = logging.getLogger("benchmarks")
+
+col_bacia = ColsOutros.bacia.value
+col_ano = ColsOutros.ano.value
+col_ano_inicio = ColsParams.ano_inicio_capex.value
+col_threshold_tir = ColsParams.threshold_tir.value
+rank_global = ColsRanks.rank_global.value
+
+col_coluna = "COLUNA"
+col_referencia = "REFERENCIA"
+col_candidato = "CANDIDATO"
+
+
+def _simulacao_completa(motor):
+    def simula(df, ano_inicio_capex, threshold_tir, rastro):
+        return aplica_anos(df, motor(df, ano_inicio_capex, threshold_tir, rastro))
+    return simula
+
+
+# Motores do params:simulacao.motor (MOTORES_SIMULACAO) como simulações completas: recebem (df, ano_inicio_capex,
+# threshold_tir, rastro) e devolvem o df simulado
+MOTORES = {nome: _simulacao_completa(motor) for nome, motor in MOTORES_SIMULACAO.items()}
+
+
+def tolerancia(coluna: str) -> float:
+    """
+    Diferença absoluta tolerada na 'coluna': meia unidade da última casa decimal do round_cols, ou zero
+    """
+    return 0.5 * 10.0 ** -DECIMAIS_OUTPUT[coluna] if coluna in DECIMAIS_OUTPUT else 0.0
+
+
+def diferencas(referencia: pd.DataFrame, candidato: pd.DataFrame, chaves: list, ordem: list = None) -> pd.DataFrame:
+    """
+    Diferenças entre dois resultados, linha a linha pelas 'chaves', uma por linha e coluna fora da tolerância (NaN
+    nos dois lados é igual). Linhas presentes em um só lado saem com COLUNA igual a 'LINHA'. O resultado vem na ordem
+    das colunas 'ordem' da referência (padrão: as chaves)
+    """
+    colunas = [coluna for coluna in referencia.columns if coluna in candidato.columns and coluna not in chaves]
+    juntos = pd.merge(referencia[chaves + colunas], candidato[chaves + colunas], on=chaves, how="outer",
+                      suffixes=("_ref", "_cand"), indicator=True, validate="one_to_one")
+    # Colunas de ordenação, com os valores da referência
+    ordem = [coluna if coluna in chaves else f"{coluna}_ref" for coluna in ordem or chaves]
+
+    partes = []
+    ausentes = juntos["_merge"] != "both"
+    if ausentes.any():
+        parte = juntos.loc[ausentes, list(dict.fromkeys(chaves + ordem))].copy()
+        parte[col_coluna] = "LINHA"
+        parte[col_referencia] = np.where(juntos.loc[ausentes, "_merge"] == "left_only", "presente", "ausente")
+        parte[col_candidato] = np.where(juntos.loc[ausentes, "_merge"] == "right_only", "presente", "ausente")
+        partes.append(parte)
+
+    juntos = juntos[~ausentes]
+    for coluna in colunas:
+        ref, cand = juntos[f"{coluna}_ref"], juntos[f"{coluna}_cand"]
+        if pd.api.types.is_numeric_dtype(ref) and pd.api.types.is_numeric_dtype(cand):
+            a, b = ref.to_numpy(dtype=float), cand.to_numpy(dtype=float)
+            with np.errstate(invalid="ignore"):
+                divergentes = ~((np.isnan(a) & np.isnan(b)) | (np.abs(a - b) <= tolerancia(coluna)))
+        else:
+            divergentes = ~((ref == cand) | (ref.isna() & cand.isna())).to_numpy()
+        if divergentes.any():
+            parte = juntos.loc[divergentes, list(dict.fromkeys(chaves + ordem))].copy()
+            parte[col_coluna] = coluna
+            parte[col_referencia] = ref[divergentes].to_numpy()
+            parte[col_candidato] = cand[divergentes].to_numpy()
+            partes.append(parte)
+
+    if not partes:
+        return pd.DataFrame(columns=chaves + [col_coluna, col_referencia, col_candidato])
+    df = pd.concat(partes, ignore_index=True).sort_values(ordem, kind="stable", na_position="last")
+    return df[chaves + [col_coluna, col_referencia, col_candidato]].reset_index(drop=True)
+
+
+def primeira_decisao_divergente(rastro_referencia: pd.DataFrame, rastro_candidato: pd.DataFrame) -> dict | None:
+    """
+    Primeira decisão em que os rastros diferem, como {'posicao', 'referencia', 'candidato'} (cada decisão como dict de
+    COLUNAS_RASTRO, ou None se o rastro daquele lado terminou antes), ou None se os rastros são iguais
+    """
+    decisoes_ref = rastro_referencia[COLUNAS_RASTRO].to_dict("records")
+    decisoes_cand = rastro_candidato[COLUNAS_RASTRO].to_dict("records")
+    for posicao in range(max(len(decisoes_ref), len(decisoes_cand))):
+        ref = decisoes_ref[posicao] if posicao < len(decisoes_ref) else None
+        cand = decisoes_cand[posicao] if posicao < len(decisoes_cand) else None
+        if ref != cand:
+            return {"posicao": posicao, "referencia": ref, "candidato": cand}
+    return None
+
+
+def verifica_paridade(input: pd.DataFrame, parametros: pd.DataFrame, motor: str = "arrays", referencia: str = "referencia",
+                      ranking_candidato=None) -> dict:
+    """
+    Roda o 'motor' e a 'referencia' (nomes de MOTORES) sobre o mesmo input pré-processado e compara os resultados
+    (ver diferencas) e os rastros. Com 'ranking_candidato', compara também o ranking_bacias dele com o do
+    calcula_ranking_bacias; a simulação usa sempre o ranking de referência, para isolar as divergências do motor.
+
+    Retorna um dict com as diferenças de 'ranking_bacias' (None sem ranking candidato) e de 'bacias_priorizadas',
+    a 'primeira_decisao' divergente do rastro e a 'primeira_bacia_ano' divergente (None quando não há)
+    """
+    ano_inicio_capex = parametros[col_ano_inicio].iloc[0]
+    threshold_tir = parametros[col_threshold_tir].iloc[0]
+
+    ranking_bacias = calcula_ranking_bacias(input.copy(), parametros)
+    diferencas_ranking = None
+    if ranking_candidato is not None:
+        diferencas_ranking = diferencas(ranking_bacias, ranking_candidato(input.copy(), parametros), [col_bacia], [rank_global])
+
+    input_pre_processado = pre_processa_input(input.copy(), ranking_bacias)
+    resultados, rastros = {}, {}
+    for nome in (referencia, motor):
+        rastro = RastroDecisoes(ativo=True)
+        resultados[nome] = MOTORES[nome](input_pre_processado.copy(), ano_inicio_capex, threshold_tir, rastro)
+        rastros[nome] = rastro.para_dataframe()
+
+    diferencas_bacias = diferencas(resultados[referencia], resultados[motor], [col_bacia, col_ano], [col_ano, rank_global])
+    return {
+        "ranking_bacias": diferencas_ranking,
+        "bacias_priorizadas": diferencas_bacias,
+        "primeira_decisao": primeira_decisao_divergente(rastros[referencia], rastros[motor]),
+        "primeira_bacia_ano": diferencas_bacias.iloc[0].to_dict() if len(diferencas_bacias) else None,
+    }
+
+
+def diverge(relatorio: dict) -> bool:
+    return (relatorio["primeira_decisao"] is not None or len(relatorio["bacias_priorizadas"]) > 0
+            or (relatorio["ranking_bacias"] is not None and len(relatorio["ranking_bacias"]) > 0))
+
+
+def descreve(relatorio: dict) -> list:
+    """
+    Linhas de texto do relatório de verifica_paridade
+    """
+    linhas = []
+    if relatorio["ranking_bacias"] is not None and len(relatorio["ranking_bacias"]):
+        primeira = relatorio["ranking_bacias"].iloc[0]
+        linhas.append(f"ranking_bacias: {len(relatorio['ranking_bacias'])} diferença(s); primeira na bacia {primeira[col_bacia]}, "
+                      f"{primeira[col_coluna]}: referência {primeira[col_referencia]}, candidato {primeira[col_candidato]}")
+    decisao = relatorio["primeira_decisao"]
+    if decisao is not None:
+        linhas.append(f"rastro: primeira decisão divergente na posição {decisao['posicao']}: "
+                      f"referência {decisao['referencia']}, candidato {decisao['candidato']}")
+    primeira = relatorio["primeira_bacia_ano"]
+    if primeira is not None:
+        linhas.append(f"bacias_priorizadas: {len(relatorio['bacias_priorizadas'])} diferença(s); primeira na bacia "
+                      f"{primeira[col_bacia]}, ano {primeira[col_ano]}, {primeira[col_coluna]}: referência {primeira[col_referencia]}, "
+                      f"candidato {primeira[col_candidato]}")
+    return linhas
+
+
+def main(argumentos: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Paridade de um motor da simulação com a implementação de referência")
+    parser.add_argument("--motor", choices=list(MOTORES), default="arrays")
+    parser.add_argument("--referencia", choices=list(MOTORES), default="referencia")
+    parser.add_argument("--seeds", nargs=2, type=int, default=[0, 20], metavar=("INICIO", "FIM"))
+    parser.add_argument("--profundidade", type=int, default=2, help="profundidade máxima das cadeias de predecessoras")
+    args = parser.parse_args(argumentos)
+
+    divergentes = 0
+    for seed in range(*args.seeds):
+        # Tamanho da concessão sorteado pela seed, pequeno o bastante para a referência em pandas
+        rng = np.random.default_rng(seed)
+        n_bacias = int(rng.integers(10, 80))
+        n_municipios = int(rng.integers(1, min(n_bacias, 10) + 1))
+        n_blocos = int(rng.integers(1, n_municipios + 1))
+        input, parametros = gera_concessao(n_bacias, n_municipios, n_blocos, int(rng.integers(3, 8)), args.profundidade, seed)
+
+        relatorio = verifica_paridade(input, parametros, args.motor, args.referencia)
+        if diverge(relatorio):
+            divergentes += 1
+            logger.error("Seed %d (%d bacias, %d municípios, %d blocos): DIVERGÊNCIA", seed, n_bacias, n_municipios, n_blocos)
+            for linha in descreve(relatorio):
+                logger.error("  %s", linha)
+        else:
+            logger.info("Seed %d (%d bacias, %d municípios, %d blocos): OK", seed, n_bacias, n_municipios, n_blocos)
+
+    logger.info("%s contra %s: %d de %d concessões divergentes", args.motor, args.referencia, divergentes, args.seeds[1] - args.seeds[0])
+    return 1 if divergentes else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logging.getLogger("priorizacao_capex").setLevel(logging.WARNING)
+    sys.exit(main())
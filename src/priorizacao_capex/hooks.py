@@ -0,0 +1,208 @@
+"""
+Hooks de métricas de execução.
+
+Para cada nó, MetricasHooks registra o tempo de relógio, o tempo de CPU e a memória residente (RSS) do processo durante
+o nó; para cada dataset, o tempo de cada leitura e gravação (com o nó que a fez); e as etapas cronometradas
+dentro dos nós (objects/utils/metricas), como cada ano e cada fase (município, bloco, global) do prioriza_bacias.
+
+Ao fim do pipeline as métricas são acrescentadas ao arquivo JSON Lines 'arquivo' (uma linha por medida, com a sessão
+e o pipeline) e, com sqlite=True, à tabela 'metricas' do banco do SESSION_STORE_CLASS (session_store.db no diretório
+de SESSION_STORE_ARGS['path']).
+
+Em um nó gerador (como o prioriza_bacias_por_ano), o Kedro chama after_node_run antes de consumir as saídas: o trabalho
+do nó acontece entre as gravações de cada parte. A medida desse nó é encerrada ao fim da última gravação (registrada no
+before_node_run seguinte ou no fim do pipeline), e inclui o tempo das gravações.
+
+A memória de cada nó é o pico de RSS durante o nó (pico_rss_mb) onde o pico do processo pode ser reiniciado (Linux,
+pelo /proc/self/clear_refs). Nas demais plataformas o pico do processo só cresce, e o nó registra quanto ele subiu
+durante o nó (incremento_pico_rss_mb): zero para um nó que coube no pico de um nó anterior.
+
+As medidas supõem o SequentialRunner: com o ParallelRunner, os nós rodam em outros processos e as suas métricas não
+são coletadas.
+"""
+import json
+import logging
+import sqlite3
+import sys
+import time
+from collections.abc import Iterator
+from datetime import datetime
+from pathlib import Path
+
+from kedro.framework.hooks import hook_impl
+from priorizacao_capex.objects.utils.metricas import ativa_etapas, retira_etapas
+
+logger = logging.getLogger(__name__)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+COLUNAS_SQLITE = ["sessao", "pipeline", "data", "tipo", "nome", "no", "ano", "tempo_s", "tempo_cpu_s", "pico_rss_mb",
+                  "incremento_pico_rss_mb"]
+
+
+def reinicia_pico_rss() -> bool:
+    """
+    Reinicia o pico de memória residente do processo (VmHWM do Linux) no RSS atual. Retorna False se a plataforma não
+    permite
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as arquivo:
+            arquivo.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def pico_rss_mb() -> float | None:
+    """
+    Pico de memória residente do processo desde o início ou desde o último reinicia_pico_rss, em MB (None se a
+    plataforma não oferece a medida)
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for linha in status:
+                if linha.startswith("VmHWM:"):
+                    return int(linha.split()[1]) / 2**10
+    except OSError:
+        pass
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss é em bytes no macOS e em KB nos demais sistemas
+        return pico / 2**20 if sys.platform == "darwin" else pico / 2**10
+    if psutil is not None:
+        memoria = psutil.Process().memory_info()
+        return getattr(memoria, "peak_wset", memoria.rss) / 2**20
+    return None
+
+
+class MetricasHooks:
+    def __init__(self, arquivo: str = "data/06_metricas/metricas.jsonl", sqlite: bool = False):
+        self._arquivo = Path(arquivo)
+        self._sqlite = sqlite
+        self._projeto = Path.cwd()
+        self._medidas = []
+        self._inicios = {}
+        self._contexto = {}
+        self._gerador = None
+
+    @hook_impl
+    def after_context_created(self, context) -> None:
+        self._projeto = Path(context.project_path)
+
+    @hook_impl
+    def before_pipeline_run(self, run_params: dict) -> None:
+        self._medidas = []
+        self._inicios = {}
+        self._gerador = None
+        self._contexto = {"sessao": run_params.get("session_id"), "pipeline": run_params.get("pipeline_name") or "__default__",
+                          "data": datetime.now().isoformat(timespec="seconds")}
+
+    @hook_impl
+    def before_node_run(self, node) -> None:
+        self._encerra_gerador()
+        ativa_etapas()
+        # Sem reiniciar o pico do processo, guarda o pico antes do nó para registrar o incremento
+        pico_antes = None if reinicia_pico_rss() else pico_rss_mb()
+        self._inicios[("no", node.name)] = (time.perf_counter(), time.process_time(), pico_antes)
+
+    @hook_impl
+    def after_node_run(self, node, outputs: dict) -> None:
+        if outputs and all(isinstance(saida, Iterator) for saida in outputs.values()):
+            # Nó gerador: as saídas ainda não foram consumidas, a medida segue aberta até a última gravação
+            self._gerador = (node.name, time.perf_counter(), time.process_time(), pico_rss_mb())
+            return
+        self._encerra_no(node.name, time.perf_counter(), time.process_time(), pico_rss_mb())
+
+    @hook_impl
+    def on_node_error(self, node) -> None:
+        self._inicios.pop(("no", node.name), None)
+        self._gerador = None
+        retira_etapas()
+
+    @hook_impl
+    def on_pipeline_error(self) -> None:
+        self._gerador = None
+        retira_etapas()
+
+    def _encerra_no(self, nome: str, fim: float, fim_cpu: float, pico: float | None) -> None:
+        inicio, inicio_cpu, pico_antes = self._inicios.pop(("no", nome))
+        medida = {"tipo": "no", "nome": nome, "tempo_s": fim - inicio, "tempo_cpu_s": fim_cpu - inicio_cpu}
+        if pico_antes is None:
+            medida["pico_rss_mb"] = pico
+        else:
+            medida["incremento_pico_rss_mb"] = pico - pico_antes if pico is not None else None
+        self._medidas.append(medida)
+        for etapa in retira_etapas():
+            self._medidas.append({"tipo": "etapa", "nome": etapa.pop("etapa"), "no": nome, **etapa})
+
+    def _encerra_gerador(self) -> None:
+        """
+        Encerra a medida do nó gerador pendente, se houver, no fim da sua última gravação
+        """
+        if self._gerador is not None:
+            self._encerra_no(*self._gerador)
+            self._gerador = None
+
+    @hook_impl
+    def before_dataset_loaded(self, dataset_name: str, node) -> None:
+        self._inicios[("leitura", dataset_name, node.name)] = time.perf_counter()
+
+    @hook_impl
+    def after_dataset_loaded(self, dataset_name: str, node) -> None:
+        self._mede_dataset("leitura", dataset_name, node)
+
+    @hook_impl
+    def before_dataset_saved(self, dataset_name: str, node) -> None:
+        self._inicios[("gravacao", dataset_name, node.name)] = time.perf_counter()
+
+    @hook_impl
+    def after_dataset_saved(self, dataset_name: str, node) -> None:
+        self._mede_dataset("gravacao", dataset_name, node)
+        if self._gerador is not None and self._gerador[0] == node.name:
+            self._gerador = (node.name, time.perf_counter(), time.process_time(), pico_rss_mb())
+
+    def _mede_dataset(self, tipo: str, dataset_name: str, node) -> None:
+        inicio = self._inicios.pop((tipo, dataset_name, node.name), None)
+        if inicio is not None:
+            self._medidas.append({"tipo": tipo, "nome": dataset_name, "no": node.name, "tempo_s": time.perf_counter() - inicio})
+
+    @hook_impl
+    def after_pipeline_run(self) -> None:
+        self._encerra_gerador()
+        medidas = [{**self._contexto, **medida} for medida in self._medidas]
+        if not medidas:
+            return
+
+        arquivo = self._arquivo if self._arquivo.is_absolute() else self._projeto / self._arquivo
+        arquivo.parent.mkdir(parents=True, exist_ok=True)
+        with open(arquivo, "a", encoding="utf-8") as saida:
+            for medida in medidas:
+                saida.write(json.dumps(medida, ensure_ascii=False) + "\n")
+        logger.info("%d métricas de execução gravadas em %s", len(medidas), arquivo)
+
+        if self._sqlite:
+            self._grava_sqlite(medidas)
+
+    def _grava_sqlite(self, medidas: list) -> None:
+        from kedro.framework.project import settings
+
+        banco = Path(settings.SESSION_STORE_ARGS["path"]) / "session_store.db"
+        with sqlite3.connect(banco) as conexao:
+            conexao.execute(f"CREATE TABLE IF NOT EXISTS metricas ({', '.join(COLUNAS_SQLITE)})")
+            # Tabelas criadas por versões anteriores, sem as colunas mais novas
+            existentes = {coluna for _, coluna, *_ in conexao.execute("PRAGMA table_info(metricas)")}
+            for coluna in COLUNAS_SQLITE:
+                if coluna not in existentes:
+                    conexao.execute(f"ALTER TABLE metricas ADD COLUMN {coluna}")
+            conexao.executemany(f"INSERT INTO metricas ({', '.join(COLUNAS_SQLITE)}) VALUES ({', '.join('?' * len(COLUNAS_SQLITE))})",
+                                [[medida.get(coluna) for coluna in COLUNAS_SQLITE] for medida in medidas])
+        conexao.close()
+        logger.info("Métricas de execução gravadas na tabela metricas de %s", banco)
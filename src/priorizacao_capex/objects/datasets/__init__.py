@@ -0,0 +1,3 @@
+from .excel_em_cache import *
+from .parquet_compacto import *
+from .particionado_por_execucao import *
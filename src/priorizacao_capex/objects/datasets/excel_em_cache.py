@@ -0,0 +1,103 @@
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from kedro.io import AbstractDataset, DatasetError
+
+__all__ = ["ExcelEmCacheDataset"]
+
+logger = logging.getLogger(__name__)
+
+# Chave da impressão digital do Excel de origem nos metadados do Parquet de cache
+CHAVE_IMPRESSAO = b"priorizacao_capex.impressao_digital"
+
+
+class ExcelEmCacheDataset(AbstractDataset[None, pd.DataFrame]):
+    """
+    Leitura de uma planilha Excel com cache em Parquet. A planilha só é lida novamente quando a sua impressão digital
+    muda: tamanho e data de modificação do arquivo (impressao_digital: mtime) ou o hash SHA-256 do conteúdo
+    (impressao_digital: hash). A impressão digital e os load_args usados ficam gravados nos metadados do cache.
+
+    Exemplo no catalog.yml:
+
+        input:
+          type: priorizacao_capex.objects.datasets.ExcelEmCacheDataset
+          filepath: data/01_input/input_priorizacao.xlsx
+          cache_filepath: data/01_input/cache/input_priorizacao.parquet
+
+    O dataset é somente leitura
+    """
+
+    def __init__(self, filepath: str, cache_filepath: str = None, impressao_digital: str = "mtime", load_args: dict[str, Any] = None,
+                 metadata: dict[str, Any] = None):
+        if impressao_digital not in ("mtime", "hash"):
+            raise DatasetError(f"impressao_digital deve ser 'mtime' ou 'hash', recebido '{impressao_digital}'")
+        self._filepath = Path(filepath)
+        self._cache_filepath = Path(cache_filepath) if cache_filepath else self._filepath.with_suffix(".cache.parquet")
+        self._impressao_digital = impressao_digital
+        self._load_args = load_args or {}
+        self.metadata = metadata
+
+    def _describe(self) -> dict[str, Any]:
+        return {
+            "filepath": str(self._filepath),
+            "cache_filepath": str(self._cache_filepath),
+            "impressao_digital": self._impressao_digital,
+            "load_args": self._load_args,
+        }
+
+    def _exists(self) -> bool:
+        return self._filepath.exists()
+
+    def _impressao(self) -> bytes:
+        """
+        Impressão digital do Excel de origem, combinada com os load_args (mudar a leitura também invalida o cache)
+        """
+        if self._impressao_digital == "hash":
+            origem = hashlib.sha256(self._filepath.read_bytes()).hexdigest()
+        else:
+            estado = self._filepath.stat()
+            origem = f"{estado.st_size}-{estado.st_mtime_ns}"
+        return f"{origem}|{sorted(self._load_args.items())!r}".encode()
+
+    def _le_cache(self, impressao: bytes) -> pd.DataFrame | None:
+        if not self._cache_filepath.exists():
+            return None
+        try:
+            metadados = pq.read_schema(self._cache_filepath).metadata or {}
+        except (OSError, pa.ArrowException):
+            return None
+        if metadados.get(CHAVE_IMPRESSAO) != impressao:
+            return None
+        return pq.read_table(self._cache_filepath).to_pandas()
+
+    def _grava_cache(self, df: pd.DataFrame, impressao: bytes) -> None:
+        try:
+            tabela = pa.Table.from_pandas(df)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as erro:
+            # Colunas com tipos misturados não cabem em um schema Parquet; segue sem cache
+            logger.warning("Não foi possível gravar o cache de %s: %s", self._filepath, erro)
+            return
+        tabela = tabela.replace_schema_metadata({**(tabela.schema.metadata or {}), CHAVE_IMPRESSAO: impressao})
+        self._cache_filepath.parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(tabela, self._cache_filepath)
+
+    def _load(self) -> pd.DataFrame:
+        impressao = self._impressao()
+        df = self._le_cache(impressao)
+        if df is not None:
+            logger.info("Lendo %s do cache %s", self._filepath, self._cache_filepath)
+            return df
+
+        df = pd.read_excel(self._filepath, **self._load_args)
+        if not isinstance(df, pd.DataFrame):
+            raise DatasetError("ExcelEmCacheDataset lê uma única aba; informe 'sheet_name' com o nome de uma aba")
+        self._grava_cache(df, impressao)
+        return df
+
+    def _save(self, data: pd.DataFrame) -> None:
+        raise DatasetError(f"ExcelEmCacheDataset é somente leitura ({self._filepath})")
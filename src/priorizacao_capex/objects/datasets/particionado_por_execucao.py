@@ -0,0 +1,33 @@
+from typing import Any
+
+from kedro_datasets.partitions import PartitionedDataset
+
+__all__ = ["ParticionadoPorExecucaoDataset"]
+
+
+class ParticionadoPorExecucaoDataset(PartitionedDataset):
+    """
+    PartitionedDataset que guarda só as partições da execução atual: a primeira gravação apaga as partições existentes
+    e as seguintes são acrescentadas, como as de um nó gerador que grava uma partição por vez. O overwrite: true do
+    PartitionedDataset apagaria, a cada gravação, as partições das gravações anteriores.
+
+    Exemplo no catalog.yml:
+
+        bacias_priorizadas_por_ano:
+          type: priorizacao_capex.objects.datasets.ParticionadoPorExecucaoDataset
+          path: data/04_final/bacias_priorizadas_por_ano
+          dataset: priorizacao_capex.objects.datasets.ParquetCompactoDataset
+          filename_suffix: .parquet
+
+    Os demais argumentos são os do PartitionedDataset
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._gravado = False
+
+    def save(self, data: dict[str, Any]) -> None:
+        if not self._gravado and self._filesystem.exists(self._normalized_path):
+            self._filesystem.rm(self._normalized_path, recursive=True)
+        self._gravado = True
+        super().save(data)
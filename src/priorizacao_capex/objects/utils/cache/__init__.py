@@ -0,0 +1 @@
+from .cache import *
\ No newline at end of file
@@ -0,0 +1,45 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+__all__ = ["chave_conteudo", "le_cache", "grava_cache"]
+
+
+def chave_conteudo(df: pd.DataFrame, colunas: list, *extras) -> str:
+    """
+    Chave SHA-256 do conteúdo das 'colunas' de 'df' (sensível à ordem das linhas e ignorando o índice) e dos 'extras'
+    """
+    hash_linhas = pd.util.hash_pandas_object(df[colunas], index=False).to_numpy()
+    chave = hashlib.sha256(hash_linhas.tobytes())
+    chave.update(repr(colunas).encode())
+    for extra in extras:
+        chave.update(repr(extra).encode())
+    return chave.hexdigest()
+
+
+def le_cache(diretorio: str, chave: str) -> pd.DataFrame | None:
+    """
+    DataFrame gravado no cache com a 'chave', ou None se não houver
+    """
+    caminho = Path(diretorio) / f"{chave}.parquet"
+    return pd.read_parquet(caminho) if caminho.exists() else None
+
+
+def grava_cache(diretorio: str, chave: str, df: pd.DataFrame) -> None:
+    """
+    Grava 'df' no cache com a 'chave'. A gravação é atômica (arquivo temporário + rename), então execuções simultâneas
+    nunca leem um cache pela metade
+    """
+    diretorio = Path(diretorio)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, suffix=".tmp")
+    os.close(descritor)
+    try:
+        df.to_parquet(temporario, index=False)
+        os.replace(temporario, diretorio / f"{chave}.parquet")
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
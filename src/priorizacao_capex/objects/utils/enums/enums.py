@@ -47,4 +47,14 @@ class ColsRanks(Enum):
     rank_bloco = 'RANK_BLOCO'
     rank_global = 'RANK_GLOBAL'
 
+class ColsRastro(Enum):
+    escopo = 'ESCOPO'
+    grupo = 'GRUPO'
+    evento = 'EVENTO'
 
+class EventosRastro(Enum):
+    nao_habilitada = 'NAO_HABILITADA'
+    habilitada_repriorizada = 'HABILITADA_REPRIORIZADA'
+    execucao_integral = 'EXECUCAO_INTEGRAL'
+    predecessora_completa = 'PREDECESSORA_COMPLETA'
+    predecessora_repriorizada = 'PREDECESSORA_REPRIORIZADA'
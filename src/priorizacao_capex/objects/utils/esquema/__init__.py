@@ -0,0 +1 @@
+from .esquema import *
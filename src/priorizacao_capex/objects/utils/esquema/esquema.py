@@ -0,0 +1,58 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from priorizacao_capex.objects.utils.enums import *
+
+__all__ = ["CHAVES", "INTEIROS", "FLOAT32", "compacta", "memoria"]
+
+logger = logging.getLogger(__name__)
+
+# Chaves de agrupamento: categóricas (ou int32, se numéricas e sem nulos)
+CHAVES = [ColsOutros.bacia.value, ColsOutros.cod_mun.value, ColsOutros.bloco.value, ColsOutros.bacia_predec.value]
+
+# Ano e rankings: int32 (colunas com nulos ou valores não inteiros são mantidas)
+INTEIROS = [ColsOutros.ano.value] + [coluna.value for coluna in ColsRanks]
+
+# Índices de cobertura, metas e TIR: float32. Só é seguro depois do round_cols do model_priorization (3 casas
+# decimais em valores da ordem de 1); as economias (ECO_*) podem passar de 2^24 e ficam em float64
+FLOAT32 = [coluna.value for coluna in ColsIC] + [coluna.value for coluna in ColsMetas] + [ColsOutros.tir.value]
+
+LIMITES_INT32 = np.iinfo(np.int32)
+
+
+def memoria(df: pd.DataFrame) -> int:
+    """
+    Memória ocupada pelo 'df' em bytes, incluindo o conteúdo das strings
+    """
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _inteiro_int32(serie: pd.Series) -> bool:
+    if not pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_bool_dtype(serie) or serie.isna().any():
+        return False
+    valores = serie.to_numpy()
+    if len(valores) == 0:
+        return True
+    return bool((valores == np.round(valores)).all() and valores.min() >= LIMITES_INT32.min and valores.max() <= LIMITES_INT32.max)
+
+
+def compacta(df: pd.DataFrame, float32: bool = False) -> pd.DataFrame:
+    """
+    Aplica os tipos compactos às colunas presentes no 'df': CHAVES categóricas (int32 se numéricas), INTEIROS em int32
+    e, com 'float32', as colunas de FLOAT32 em float32. Colunas que não admitem o tipo sem perda são mantidas.
+    Retorna um novo DataFrame
+    """
+    tipos = {}
+    for coluna in df.columns.intersection(CHAVES):
+        tipos[coluna] = "int32" if _inteiro_int32(df[coluna]) else "category"
+    for coluna in df.columns.intersection(INTEIROS):
+        if _inteiro_int32(df[coluna]):
+            tipos[coluna] = "int32"
+        else:
+            logger.debug("Coluna %s mantida como %s (nulos ou valores fora de int32)", coluna, df[coluna].dtype)
+    if float32:
+        for coluna in df.columns.intersection(FLOAT32):
+            if pd.api.types.is_float_dtype(df[coluna]):
+                tipos[coluna] = "float32"
+    return df.astype(tipos)
@@ -0,0 +1 @@
+from .grupos import *
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+__all__ = ["codifica_grupos", "soma_por_grupo", "primeira_linha_por_grupo", "espalha_por_grupo"]
+
+
+def codifica_grupos(df: pd.DataFrame, colunas: list) -> tuple[np.ndarray, int]:
+    """
+    Codifica as combinações das 'colunas' em inteiros 0..n_grupos-1 (na ordem das chaves, como no groupby), com -1 para
+    as linhas que têm alguma chave nula. Retorna os códigos e o número de grupos
+    """
+    if len(colunas) == 1:
+        codigos, chaves = pd.factorize(df[colunas[0]], sort=True)
+        return codigos, len(chaves)
+    grupos = df.groupby(colunas, sort=True, observed=True)
+    return grupos.ngroup().to_numpy(), grupos.ngroups
+
+
+def soma_por_grupo(codigos: np.ndarray, valores: np.ndarray, n_grupos: int) -> np.ndarray:
+    """
+    Soma os 'valores' de cada grupo, ignorando NaN e as linhas sem grupo. A soma é feita na ordem das linhas
+    """
+    validos = codigos >= 0
+    valores = valores[validos]
+    return np.bincount(codigos[validos], weights=np.where(np.isnan(valores), 0, valores), minlength=n_grupos)
+
+
+def primeira_linha_por_grupo(codigos: np.ndarray, n_grupos: int) -> np.ndarray:
+    """
+    Posição da primeira linha de cada grupo (-1 para grupos sem linhas)
+    """
+    primeira = np.full(n_grupos, -1, dtype=np.int64)
+    grupos, posicoes = np.unique(codigos, return_index=True)
+    validos = grupos >= 0
+    primeira[grupos[validos]] = posicoes[validos]
+    return primeira
+
+
+def espalha_por_grupo(codigos: np.ndarray, valores_grupo: np.ndarray) -> np.ndarray:
+    """
+    Espalha um valor por grupo para as linhas do grupo, com NaN nas linhas sem grupo
+    """
+    if len(valores_grupo) == 0:
+        return np.full(len(codigos), np.nan)
+    return np.where(codigos >= 0, valores_grupo[np.maximum(codigos, 0)], np.nan)
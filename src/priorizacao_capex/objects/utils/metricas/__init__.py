@@ -0,0 +1 @@
+from .metricas import *
\ No newline at end of file
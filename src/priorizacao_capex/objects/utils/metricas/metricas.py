@@ -0,0 +1,49 @@
+"""
+Cronometragem de etapas internas dos nós (por exemplo, as fases de cada ano do prioriza_bacias).
+
+As etapas só são registradas enquanto a coleta está ativa (ativa_etapas), o que os hooks de métricas fazem durante a
+execução de cada nó; fora dela, cronometra não registra nada. As etapas executadas em outros processos (fases em
+paralelo do simulador, varredura de cenários) não são coletadas.
+"""
+import time
+from contextlib import contextmanager
+
+__all__ = ["ativa_etapas", "retira_etapas", "cronometra"]
+
+_etapas = None
+
+
+def ativa_etapas() -> None:
+    """
+    Inicia a coleta das etapas cronometradas, descartando as da coleta anterior
+    """
+    global _etapas
+    _etapas = []
+
+
+def retira_etapas() -> list:
+    """
+    Encerra a coleta e devolve as etapas registradas desde ativa_etapas, cada uma como dict com a 'etapa', os seus
+    rótulos, 'tempo_s' e 'tempo_cpu_s'
+    """
+    global _etapas
+    etapas, _etapas = _etapas or [], None
+    return etapas
+
+
+@contextmanager
+def cronometra(etapa: str, **rotulos):
+    """
+    Registra o tempo de relógio e de CPU do bloco como a 'etapa' (com os 'rotulos', como ano=2025), se a coleta estiver
+    ativa
+    """
+    if _etapas is None:
+        yield
+        return
+    inicio, inicio_cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        if _etapas is not None:
+            _etapas.append({"etapa": etapa, **rotulos, "tempo_s": time.perf_counter() - inicio,
+                            "tempo_cpu_s": time.process_time() - inicio_cpu})
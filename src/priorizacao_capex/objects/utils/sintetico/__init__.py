@@ -0,0 +1 @@
+from .sintetico import *
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+from priorizacao_capex.objects.utils.enums import *
+
+__all__ = ["gera_concessao"]
+
+
+def gera_concessao(n_bacias: int, n_municipios: int, n_blocos: int, n_anos: int, profundidade_predec: int = 1, seed: int = 0,
+                    predecessoras_bloqueadas: bool = False) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Concessão sintética com as colunas do input_priorizacao.xlsx (input) e do input_parametros.xlsx (parametros), para
+    testes e benchmarks. Cada bloco tem ao menos um município e cada município ao menos uma bacia.
+
+    Cerca de 30% das bacias dependem de uma predecessora sorteada entre as anteriores, formando cadeias de até
+    'profundidade_predec' níveis. As predecessoras têm TIR baixa e IC inicial abaixo do EXEC_PREDEC, para que as
+    dependentes passem pela repriorização. Nas cadeias com mais de um nível, a predecessora de uma predecessora já
+    começa acima do EXEC_PREDEC: uma predecessora bloqueada pela sua própria predecessora pode ser repriorizada
+    indefinidamente pelo atinge_meta. Com 'predecessoras_bloqueadas', esse ajuste não é feito, para reproduzir esse
+    caso (a simulação de uma concessão assim pode não terminar). O ECO_INCR_CONCED é acumulado a partir do ano 3, como
+    no input real
+    """
+    rng = np.random.default_rng(seed)
+    bloco_mun = np.r_[np.arange(n_blocos), rng.integers(0, n_blocos, n_municipios - n_blocos)]
+    mun_bacia = np.r_[np.arange(n_municipios), rng.integers(0, n_municipios, n_bacias - n_municipios)]
+    nomes = [f"B{i:04d}" for i in range(n_bacias)]
+
+    predec = [None] * n_bacias
+    profundidade = np.zeros(n_bacias, dtype=int)
+    exec_predec = np.ones(n_bacias)
+    for i in range(1, n_bacias):
+        j = int(rng.integers(0, i))
+        if rng.random() < 0.3 and profundidade[j] < profundidade_predec:
+            predec[i] = nomes[j]
+            profundidade[i] = profundidade[j] + 1
+            exec_predec[j] = rng.choice([0.5, 0.7, 0.8])
+    eh_predec = exec_predec < 1
+
+    capex = rng.uniform(50, 200, n_bacias)
+    receita = np.where(eh_predec, capex / (n_anos - 1) * rng.uniform(1.0, 1.25, n_bacias), rng.uniform(-5, 40, n_bacias))
+    ic_inicial = rng.uniform(0, 0.9, n_bacias)
+    ic_inicial = np.where(eh_predec, np.minimum(ic_inicial, exec_predec * 0.8), ic_inicial)
+    if not predecessoras_bloqueadas:
+        predec_de_predec = [int(predec[i][1:]) for i in np.flatnonzero(eh_predec) if predec[i] is not None]
+        ic_inicial[predec_de_predec] = exec_predec[predec_de_predec] + 0.01
+    eco_pot_inicial = rng.uniform(100, 2000, n_bacias)
+    crescimento = rng.uniform(0.0, 0.03, n_bacias)
+    incr = np.where(rng.random(n_bacias) < 0.2, rng.uniform(0.05, 0.5, n_bacias) * (1 - ic_inicial) * eco_pot_inicial, 0.0)
+    meta_inicial = rng.uniform(0.3, 0.6, n_municipios)
+
+    bacia, ano = np.divmod(np.arange(n_bacias * n_anos), n_anos)
+    avanco = ano / (n_anos - 1)
+    nomes_blocos = np.array([f"BL{b}" for b in range(n_blocos)], dtype=object)
+    input = pd.DataFrame({
+        ColsOutros.cod_mun.value: 1000 + mun_bacia[bacia],
+        ColsOutros.bloco.value: nomes_blocos[bloco_mun[mun_bacia[bacia]]],
+        ColsOutros.bacia.value: np.array(nomes)[bacia],
+        ColsOutros.ano.value: ano,
+        ColsOutros.fluxo.value: np.where(ano == 0, -capex[bacia], receita[bacia]),
+        ColsIC.ic_e.value: ic_inicial[bacia],
+        ColsEco.eco_pot.value: eco_pot_inicial[bacia] * (1 + crescimento[bacia]) ** ano,
+        ColsEco.eco_incr_conced.value: np.where(ano >= 3, incr[bacia], 0.0),
+        ColsMetas.meta_mun.value: meta_inicial[mun_bacia[bacia]] + (0.99 - meta_inicial[mun_bacia[bacia]]) * avanco,
+        ColsMetas.meta_bloco.value: 0.5 + 0.4 * avanco,
+        ColsMetas.meta_global.value: 0.55 + 0.4 * avanco,
+        ColsOutros.bacia_predec.value: np.array(predec, dtype=object)[bacia],
+        ColsOutros.exec_predec.value: exec_predec[bacia],
+    })
+    parametros = pd.DataFrame({ColsParams.taxa_desconto.value: [0.1], ColsParams.ano_inicio_capex.value: [2], ColsParams.threshold_tir.value: [0.2]})
+    return input, parametros
@@ -4,6 +4,8 @@ from typing import Dict
 from kedro.framework.project import find_pipelines
 from kedro.pipeline import Pipeline
 
+from priorizacao_capex.pipelines.model_priorization.pipeline import create_pipeline_por_ano
+
 
 def register_pipelines() -> Dict[str, Pipeline]:
     """Register the project's pipelines.
@@ -12,5 +14,8 @@ def register_pipelines() -> Dict[str, Pipeline]:
         A mapping from pipeline names to ``Pipeline`` objects.
     """
     pipelines = find_pipelines()
-    pipelines["__default__"] = sum(pipelines.values())
+    # A varredura de cenários roda apenas quando pedida (kedro run --pipeline cenarios)
+    # Saída ano a ano em partições: roda apenas quando pedida (kedro run --pipeline model_priorization_por_ano)
+    pipelines["model_priorization_por_ano"] = create_pipeline_por_ano()
+    pipelines["__default__"] = sum(pipeline for nome, pipeline in pipelines.items() if nome not in ("cenarios", "model_priorization_por_ano"))
     return pipelines
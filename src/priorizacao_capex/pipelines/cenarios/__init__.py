@@ -0,0 +1,9 @@
+"""
+Pipeline 'cenarios': varredura de cenários de parâmetros do data_processing e do model_priorization
+"""
+
+from .pipeline import create_pipeline
+
+__all__ = ["create_pipeline"]
+
+__version__ = "0.1"
@@ -0,0 +1,99 @@
+import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from priorizacao_capex.objects.utils.enums import *
+from priorizacao_capex.pipelines.data_processing.nodes import calcula_ranking_bacias, pre_processa_input
+from priorizacao_capex.pipelines.model_priorization.nodes import prioriza_bacias
+
+logger = logging.getLogger(__name__)
+
+# Definindo atalhos para captar os nomes de colunas por meio do Enums
+col_tx_desc = ColsParams.taxa_desconto.value
+col_ano_inicio = ColsParams.ano_inicio_capex.value
+col_threshold_tir = ColsParams.threshold_tir.value
+
+col_cenario = "CENARIO"
+
+# Parâmetros variados na grade de cenários, na ordem das colunas do resultado
+COLUNAS_CENARIO = [col_tx_desc, col_ano_inicio, col_threshold_tir]
+
+# Estado de cada processo da varredura: o input e os parâmetros fixos (cache do ranking e params:simulacao) são
+# recebidos uma única vez na criação do processo, e o input pré-processado é guardado por taxa_desconto (único
+# parâmetro que muda o ranking)
+_input = None
+_cache_ranking_bacias = None
+_simulacao = None
+_pre_processado_por_taxa = {}
+
+
+def monta_cenarios(parametros: pd.DataFrame, grade_cenarios: dict) -> pd.DataFrame:
+    """
+    Produto cartesiano dos valores da 'grade_cenarios' para TAXA_DESCONTO, ANO_INICIO_CAPEX e THRESHOLD_TIR. Parâmetros
+    ausentes da grade ficam com o valor do input_parametros.xlsx. Cada combinação recebe um número de CENARIO
+    """
+    valores = [grade_cenarios.get(coluna) or [parametros[coluna].iloc[0]] for coluna in COLUNAS_CENARIO]
+    cenarios = pd.DataFrame(list(itertools.product(*valores)), columns=COLUNAS_CENARIO)
+    cenarios.insert(0, col_cenario, range(1, len(cenarios) + 1))
+    return cenarios
+
+
+def _inicializa_processo(input: pd.DataFrame, cache_ranking_bacias: dict, simulacao: dict) -> None:
+    global _input, _cache_ranking_bacias, _simulacao
+    _input = input
+    _cache_ranking_bacias = cache_ranking_bacias
+    _simulacao = simulacao
+    _pre_processado_por_taxa.clear()
+
+
+def _executa_cenario(parametros: pd.DataFrame) -> pd.DataFrame:
+    """
+    Roda o data_processing e o model_priorization para os 'parametros' de um cenário e devolve o dataset_resumo
+    """
+    taxa_desconto = parametros[col_tx_desc].iloc[0]
+    if taxa_desconto not in _pre_processado_por_taxa:
+        ranking_bacias = calcula_ranking_bacias(_input.copy(), parametros, _cache_ranking_bacias)
+        _pre_processado_por_taxa[taxa_desconto] = pre_processa_input(_input.copy(), ranking_bacias)
+
+    _, df_report, _ = prioriza_bacias(_pre_processado_por_taxa[taxa_desconto].copy(), parametros, _simulacao)
+    return df_report
+
+
+def varre_cenarios(input: pd.DataFrame, parametros: pd.DataFrame, grade_cenarios: dict, cache_ranking_bacias: dict = None,
+                   simulacao: dict = None) -> pd.DataFrame:
+    """
+    Roda os pipelines data_processing e model_priorization para cada combinação da 'grade_cenarios' em um pool de
+    processos (grade_cenarios['n_processos'], padrão: número de CPUs; 1 roda no próprio processo). O input é lido uma
+    única vez e enviado a cada processo na sua criação, sem nova leitura do Excel. Cada cenário é simulado com o
+    'simulacao' (params:simulacao: motor, n_processos e checkpoint), como no model_priorization.
+
+    Retorna o dataset_resumo de todos os cenários empilhado, com o CENARIO e os seus parâmetros nas primeiras colunas
+    """
+    cenarios = monta_cenarios(parametros, grade_cenarios)
+    parametros_cenarios = []
+    for cenario in cenarios.to_dict("records"):
+        parametros_cenario = parametros.iloc[[0]].reset_index(drop=True)
+        for coluna in COLUNAS_CENARIO:
+            parametros_cenario[coluna] = cenario[coluna]
+        parametros_cenarios.append(parametros_cenario)
+
+    n_processos = min(grade_cenarios.get("n_processos") or os.cpu_count() or 1, len(cenarios))
+    logger.info("Varrendo %d cenários em %d processo(s)", len(cenarios), n_processos)
+    if n_processos <= 1:
+        _inicializa_processo(input, cache_ranking_bacias, simulacao)
+        resultados = [_executa_cenario(parametros_cenario) for parametros_cenario in parametros_cenarios]
+        _inicializa_processo(None, None, None)
+    else:
+        with ProcessPoolExecutor(n_processos, initializer=_inicializa_processo, initargs=(input, cache_ranking_bacias, simulacao)) as executor:
+            resultados = list(executor.map(_executa_cenario, parametros_cenarios))
+
+    resultados_cenarios = []
+    for cenario, df_report in zip(cenarios.to_dict("records"), resultados):
+        df_report = df_report.reset_index(drop=True)
+        for posicao, coluna in enumerate([col_cenario] + COLUNAS_CENARIO):
+            df_report.insert(posicao, coluna, cenario[coluna])
+        resultados_cenarios.append(df_report)
+
+    return pd.concat(resultados_cenarios, ignore_index=True)
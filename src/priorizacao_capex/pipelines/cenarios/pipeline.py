@@ -0,0 +1,15 @@
+from kedro.pipeline import Pipeline, node, pipeline
+
+from .nodes import varre_cenarios
+
+
+def create_pipeline(**kwargs) -> Pipeline:
+    return pipeline(
+        [
+            node(
+                func=varre_cenarios,
+                inputs=["input", "parametros", "params:grade_cenarios", "params:cache_ranking_bacias", "params:simulacao"],
+                outputs="resultados_cenarios",
+                name="varre_cenarios_node",
+            ),
+        ])
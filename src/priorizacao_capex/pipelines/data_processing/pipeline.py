@@ -8,7 +8,7 @@ def create_pipeline(**kwargs) -> Pipeline:
         [
             node(
                 func=calcula_ranking_bacias,
-                inputs=["input", "parametros"],
+                inputs=["input", "parametros", "params:cache_ranking_bacias"],
                 outputs="ranking_bacias",
                 name="calcula_ranking_bacias_node",
             ),
@@ -0,0 +1,102 @@
+"""
+Checkpoint por ano da simulação do prioriza_bacias.
+
+Ao fim de cada ano, o estado final das bacias (colunas de COLUNAS_ESTADO, na ordem das linhas do ano no input) e o
+rastro do ano são gravados no diretório do checkpoint, com o nome derivado da chave do ano. Como cada ano depende
+apenas das suas linhas do input e do estado final do ano anterior, a chave de um ano encadeia a chave do ano anterior
+com o conteúdo das linhas do ano (a do primeiro ano parte dos parâmetros da simulação).
+
+Uma execução com retomar=True carrega, em ordem, os anos cuja chave já tem checkpoint e simula apenas a partir do
+primeiro que não tem. Isso cobre tanto a retomada de uma execução interrompida quanto a repriorização incremental:
+se o input muda apenas a partir do ano Y, os anos anteriores a Y mantêm a chave e são reaproveitados da última
+execução, e só Y em diante é simulado novamente.
+"""
+import logging
+from collections.abc import Iterator
+
+import numpy as np
+import pandas as pd
+from priorizacao_capex.objects.utils.cache import chave_conteudo, grava_cache, le_cache
+from priorizacao_capex.objects.utils.enums import *
+
+from .rastro import COLUNAS_RASTRO, RastroDecisoes
+from .simulador import COLUNAS_ESTADO, simula_por_ano
+
+logger = logging.getLogger(__name__)
+
+col_ano = ColsOutros.ano.value
+
+
+def chaves_por_ano(df: pd.DataFrame, anos: list, ano_inicio_capex: int, threshold_tir: float, motor: str = "arrays",
+                   rastro_ativo: bool = False) -> dict:
+    """
+    Chave do checkpoint de cada um dos 'anos' (em ordem): conteúdo de todas as colunas das linhas do ano, encadeado
+    com a chave do ano anterior. A chave de um ano muda se o input desse ano ou de qualquer ano anterior mudar. O nome
+    do 'motor' e se o rastro está ligado entram na chave do primeiro ano: motores diferentes não reaproveitem o
+    checkpoint um do outro, e um checkpoint gravado com o rastro desligado (rastro vazio) não é lido por uma execução
+    com o rastro ligado
+    """
+    anos_df = df[col_ano].to_numpy()
+    colunas = list(df.columns)
+    chave = repr((int(ano_inicio_capex), float(threshold_tir), motor, bool(rastro_ativo)))
+    chaves = {}
+    for ano in anos:
+        chave = chave_conteudo(df.iloc[np.flatnonzero(anos_df == ano)], colunas, chave)
+        chaves[ano] = chave
+    return chaves
+
+
+def _nome(chave: str, ano: int, sufixo: str) -> str:
+    return f"{chave}_{col_ano}_{int(ano):04d}_{sufixo}"
+
+
+def carrega_anos_concluidos(diretorio: str, chaves: dict) -> list:
+    """
+    Estado e rastro gravados para os anos de 'chaves' (ver chaves_por_ano), até o primeiro ano sem checkpoint. Cada
+    item é (ano, estado, df_rastro)
+    """
+    concluidos = []
+    for ano, chave in chaves.items():
+        df_estado = le_cache(diretorio, _nome(chave, ano, "estado"))
+        if df_estado is None:
+            break
+        df_rastro = le_cache(diretorio, _nome(chave, ano, "rastro"))
+        estado = {coluna: df_estado[coluna].to_numpy(dtype=float) for coluna in COLUNAS_ESTADO}
+        concluidos.append((ano, estado, df_rastro))
+    return concluidos
+
+
+def simula_com_checkpoint(df: pd.DataFrame, ano_inicio_capex: int, threshold_tir: float, rastro: RastroDecisoes,
+                          n_processos: int, diretorio: str, retomar: bool = False, motor=None, nome_motor: str = "arrays") -> Iterator[tuple]:
+    """
+    Simulação do 'motor' (padrão: simula_por_ano, de nome 'nome_motor') com checkpoint em 'diretorio' após cada ano.
+    Com 'retomar', os anos cujo input (e o dos anos anteriores) não mudou desde a execução do mesmo motor que gravou o
+    checkpoint são lidos dele (estado e rastro) em vez de simulados; o resultado é idêntico ao de uma execução completa
+    """
+    motor = motor or simula_por_ano
+    anos = df[col_ano].to_numpy()
+    chaves = chaves_por_ano(df, sorted(pd.unique(anos[anos >= ano_inicio_capex])), ano_inicio_capex, threshold_tir, nome_motor,
+                            rastro.ativo)
+
+    retomada = None
+    if retomar:
+        concluidos = carrega_anos_concluidos(diretorio, chaves)
+        if len(concluidos) < len(chaves):
+            logger.info("Reaproveitando %d ano(s) do checkpoint; simulando a partir do ano %s", len(concluidos), list(chaves)[len(concluidos)])
+        else:
+            logger.info("Reaproveitando todos os %d ano(s) do checkpoint", len(concluidos))
+        for ano, estado, df_rastro in concluidos:
+            if rastro.ativo:
+                for decisao in df_rastro[COLUNAS_RASTRO].itertuples(index=False):
+                    rastro.anexa(tuple(decisao))
+            yield ano, np.flatnonzero(anos == ano), estado
+            retomada = (ano, estado)
+
+    # Decisões do rastro registradas antes do ano em simulação (quem consome os anos pode esvaziar o rastro)
+    inicio = len(rastro)
+    for ano, posicoes, estado in motor(df, ano_inicio_capex, threshold_tir, rastro, n_processos, retomada):
+        # O rastro é gravado antes do estado: a presença do estado marca o ano como concluído
+        grava_cache(diretorio, _nome(chaves[ano], ano, "rastro"), rastro.para_dataframe(inicio))
+        grava_cache(diretorio, _nome(chaves[ano], ano, "estado"), pd.DataFrame(estado, columns=COLUNAS_ESTADO))
+        yield ano, posicoes, estado
+        inicio = len(rastro)
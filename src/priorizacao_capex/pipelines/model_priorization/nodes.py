@@ -1,7 +1,19 @@
+import logging
+from functools import partial
+
+import numpy as np
 import pandas as pd
 from priorizacao_capex.objects.utils.enums import *
+from priorizacao_capex.objects.utils.grupos import codifica_grupos, espalha_por_grupo, primeira_linha_por_grupo, soma_por_grupo
+from collections.abc import Iterator
 from typing import Tuple
 
+from .rastro import ESCOPO_BLOCO, ESCOPO_GLOBAL, ESCOPO_MUNICIPIO, RastroDecisoes
+from .checkpoint import simula_com_checkpoint
+from .simulador import COLUNAS_ESTADO, aplica_anos, simula_por_ano
+
+logger = logging.getLogger(__name__)
+
 # Definindo atalhos para captar os nomes de colunas por meio do Enums
 col_ano_inicio = ColsParams.ano_inicio_capex.value
 col_threshold_tir = ColsParams.threshold_tir.value
@@ -39,53 +51,74 @@ rank_mun = ColsRanks.rank_mun.value
 rank_bloco = ColsRanks.rank_bloco.value
 rank_global = ColsRanks.rank_global.value
 
+# Colunas das bacias alteradas pelo atinge_meta dentro de um município ou bloco
+COLUNAS_GRUPO = [ic_bac_tot, ic_bac, eco_fact_bac]
+
+
+# Casas decimais de cada coluna do output (round_cols). Também definem a tolerância da comparação de paridade entre
+# motores (benchmarks/paridade.py)
+DECIMAIS_OUTPUT = {
+    ic_e: 3,
+    eco_pot: 0,
+    eco_incr_conced: 0,
+    meta_mun: 3,
+    meta_bloco: 3,
+    meta_global: 3,
+    ic_bac_apoio: 3,
+    eco_pot_mun: 0,
+    eco_pot_blo: 0,
+    eco_pot_glo: 0,
+    eco_fact_bac: 0,
+    ic_mun: 3,
+    ic_blo: 3,
+    ic_glo: 3,
+    ic_bac: 3,
+    ic_bac_tot: 3,
+    col_tir: 3}
+
 
 def round_cols(df: pd.DataFrame) -> pd.DataFrame:
     """
     Arredonda casas decimais para o output no final de tudo
     """
-    # Dicionário mapeando as colunas ao número de casas decimais
-    colunas_arredondamento = {
-        ic_e: 3,
-        eco_pot: 0,
-        eco_incr_conced: 0,
-        meta_mun: 3,
-        meta_bloco: 3,
-        meta_global: 3,
-        ic_bac_apoio: 3,
-        eco_pot_mun: 0,
-        eco_pot_blo: 0,
-        eco_pot_glo: 0,
-        eco_fact_bac: 0,
-        ic_mun: 3,
-        ic_blo: 3,
-        ic_glo: 3,
-        ic_bac: 3,
-        ic_bac_tot: 3,
-        col_tir: 3}
-
     # Aplicando o arredondamento com base no dicionário
-    for coluna, decimais in colunas_arredondamento.items():
+    for coluna, decimais in DECIMAIS_OUTPUT.items():
         df[coluna] = df[coluna].round(decimais)
 
     return df
 
 
+def escreve_posicoes(df: pd.DataFrame, sub_df: pd.DataFrame, posicoes: np.ndarray, colunas: list) -> pd.DataFrame:
+    """
+    Escreve as 'colunas' de 'sub_df' nas linhas de 'df' dadas pelas posições inteiras 'posicoes' (na mesma ordem das
+    linhas de 'sub_df'), in-place e sem alinhamento de índice. Valores NaN não sobrescrevem, como no DataFrame.update
+    """
+    for coluna in colunas:
+        valores = sub_df[coluna].to_numpy()
+        validos = ~pd.isna(valores)
+        df.iloc[posicoes[validos], df.columns.get_loc(coluna)] = valores[validos]
+
+    return df
+
+
 def atualiza_bacias(df: pd.DataFrame) -> pd.DataFrame:
     """
     Temos que recalcular as economias factíveis e o ic_bac da bacia pois a eco_pot aumenta todo ano (projeção populacional), mesmo que 
     a ic_bac_tot não mude
     """
-    for bacia, df_bacia in df.groupby(col_bacia):
-        # O ic_bac usa a eco_incr_conced como complemento para atingir o ic_bac_tot
-        df_bacia[ic_bac] = (df_bacia[eco_pot] * df_bacia[ic_bac_tot] - df_bacia[eco_incr_conced]) / df_bacia[eco_pot]
-        df_bacia[eco_fact_bac] = df_bacia[eco_pot] * df_bacia[ic_bac_tot]
-        df.update(df_bacia)
+    # O ic_bac usa a eco_incr_conced como complemento para atingir o ic_bac_tot
+    novo_ic_bac = (df[eco_pot] * df[ic_bac_tot] - df[eco_incr_conced]) / df[eco_pot]
+    novo_eco_fact_bac = df[eco_pot] * df[ic_bac_tot]
+
+    # Valores NaN (e bacias sem identificação) mantêm o valor anterior
+    com_bacia = df[col_bacia].notna()
+    df[ic_bac] = novo_ic_bac.where(com_bacia & novo_ic_bac.notna(), df[ic_bac])
+    df[eco_fact_bac] = novo_eco_fact_bac.where(com_bacia & novo_eco_fact_bac.notna(), df[eco_fact_bac])
 
     return df
 
 
-def reprioriza_predecessoras(df: pd.DataFrame, rank_coluna: str, rank_atual: int) -> tuple[int, bool]:
+def reprioriza_predecessoras(df: pd.DataFrame, rank_coluna: str, rank_atual: int, rastro: RastroDecisoes) -> tuple[int, bool]:
     """
     Verifica as bacias predecessoras para decidir se alguma deve ser repriorizada com base no ranking econômico
     Retorna o valor `rank_atual` da predecessora a ser repriorizada, caso haja, e atualiza a coluna auxiliar 'flag_bacia_predec'
@@ -107,7 +140,7 @@ def reprioriza_predecessoras(df: pd.DataFrame, rank_coluna: str, rank_atual: int
         # Marca bacia predecessora como completa se atingiu ic_bac_tot >= 1.0
         if bacia_predecessora[ic_bac_tot] >= 1.0:
             df.loc[df[col_bacia] == bacia_predecessora[col_bacia], "flag_bacia_predec"] = False
-            print(f"Bacia predecessora {bacia_predecessora[col_bacia]} marcada como completa")
+            rastro.registra(EventosRastro.predecessora_completa, bacia_predecessora[col_bacia])
             continue
 
         # Não repriorizar bacias predecessoras que ainda nem passaram pelo atinge_meta
@@ -118,13 +151,13 @@ def reprioriza_predecessoras(df: pd.DataFrame, rank_coluna: str, rank_atual: int
         if rank_economico_prox_bacia is not None and rank_economico_predecessora < rank_economico_prox_bacia:
             rank_atual = bacia_predecessora[rank_coluna]
             completa_predec = True
-            print(f"Bacia predecessora {bacia_predecessora[col_bacia]} repriorizada")
+            rastro.registra(EventosRastro.predecessora_repriorizada, bacia_predecessora[col_bacia])
             break
 
     return rank_atual, completa_predec
 
 
-def processa_economias_bacia(df: pd.DataFrame, grupo_ranking: pd.DataFrame, Var_Eco_coluna: float, threshold_tir: float, completa_predec: bool) -> Tuple[float, bool]:
+def processa_economias_bacia(df: pd.DataFrame, grupo_ranking: pd.DataFrame, Var_Eco_coluna: float, threshold_tir: float, completa_predec: bool, rastro: RastroDecisoes) -> Tuple[float, bool]:
     """
     Processa as economias disponíveis na bacia e atualiza o índice de cobertura.
     """
@@ -132,7 +165,7 @@ def processa_economias_bacia(df: pd.DataFrame, grupo_ranking: pd.DataFrame, Var_
     tir = grupo_ranking[col_tir].iloc[0]
     exec_predec = grupo_ranking[col_exec_predec].iloc[0]
     if completa_predec or (exec_predec < 1.0 and tir >= threshold_tir):
-        print("Reprioriza bacia predecessora:", grupo_ranking[col_bacia].iloc[0])
+        rastro.registra(EventosRastro.execucao_integral, grupo_ranking[col_bacia].iloc[0])
         grupo_ranking[col_exec_predec] = 1.0
 
     # Calcula as economias disponíveis que ainda podem ser adicionadas na bacia
@@ -154,7 +187,7 @@ def processa_economias_bacia(df: pd.DataFrame, grupo_ranking: pd.DataFrame, Var_
     return df, Var_Eco_coluna
 
 
-def verifica_bacia_habilitada(df: pd.DataFrame, grupo_ranking: pd.DataFrame, rank_coluna: str) -> tuple[bool, int]:
+def verifica_bacia_habilitada(df: pd.DataFrame, grupo_ranking: pd.DataFrame, rank_coluna: str, rastro: RastroDecisoes) -> tuple[bool, int]:
     """
     Verifica se há uma bacia habilitada para repriorização durante a iteração atual de alguma predecessora.
     Retorno: (True, rank_coluna) se houver uma bacia habilitada selecionada, senão (False, None).
@@ -192,13 +225,13 @@ def verifica_bacia_habilitada(df: pd.DataFrame, grupo_ranking: pd.DataFrame, ran
     tir_bacia_habilitada = bacia_habilitada[col_tir]
 
     if tir_bacia_habilitada >= tir_bacia_atual + 0.1:
-        print(f"Bacia habilitada boa: {bacia_habilitada[col_bacia]} com rank {bacia_habilitada[rank_coluna]} sendo repriorizada")
+        rastro.registra(EventosRastro.habilitada_repriorizada, bacia_habilitada[col_bacia])
         return True, bacia_habilitada[rank_coluna]
 
     return False, None
 
 
-def atinge_meta(df_ano_atual: pd.DataFrame, df: pd.DataFrame, meta_coluna: str, p_ic_coluna: str, rank_coluna: str, eco_pot_coluna: str, threshold_tir: float) -> pd.DataFrame:
+def atinge_meta(df_ano_atual: pd.DataFrame, df: pd.DataFrame, meta_coluna: str, p_ic_coluna: str, rank_coluna: str, eco_pot_coluna: str, threshold_tir: float, rastro: RastroDecisoes) -> pd.DataFrame:
     """
     Itera sobre as bacias para atingir a meta especificada (meta_coluna) seguindo a sequência do ranking (rank_coluna), atualizando 
     o índice de cobertura da bacia (ic_bac_tot). 
@@ -223,22 +256,22 @@ def atinge_meta(df_ano_atual: pd.DataFrame, df: pd.DataFrame, meta_coluna: str,
             df_bac_predec = df_ano_atual[df_ano_atual[col_bacia] == grupo_ranking[col_bacia_predec].iloc[0]]
             if not df_bac_predec[ic_bac_tot].iloc[0] >= df_bac_predec[col_exec_predec].iloc[0]:
                 rank_atual += 1
-                print("Bacia", grupo_ranking[col_bacia].iloc[0], "não habilitada devido a IC insuficiente da predecessora")
+                rastro.registra(EventosRastro.nao_habilitada, grupo_ranking[col_bacia].iloc[0])
                 continue
 
         # Se houver uma bacia habilitada boa o suficiente, prioriza a execução dela ao invés de executar predecessoras, e retorna ao loop anterior com o mesmo rank_atual
-        habilitada, rank_selecionado = verifica_bacia_habilitada(df, grupo_ranking, rank_coluna)
+        habilitada, rank_selecionado = verifica_bacia_habilitada(df, grupo_ranking, rank_coluna, rastro)
         if habilitada:
             grupo_ranking = df[df[rank_coluna] == rank_selecionado].copy()
-            df, Var_Eco_coluna = processa_economias_bacia(df, grupo_ranking, Var_Eco_coluna, threshold_tir, completa_predec)
+            df, Var_Eco_coluna = processa_economias_bacia(df, grupo_ranking, Var_Eco_coluna, threshold_tir, completa_predec, rastro)
             continue
         
         # Processa economias da bacia atual
-        df, Var_Eco_coluna = processa_economias_bacia(df, grupo_ranking, Var_Eco_coluna, threshold_tir, completa_predec)
+        df, Var_Eco_coluna = processa_economias_bacia(df, grupo_ranking, Var_Eco_coluna, threshold_tir, completa_predec, rastro)
 
         # Caso necessário, retornar às bacias predecessoras e verificar repriorização caso vantajoso
         if round(Var_Eco_coluna, 0) > 0:
-            rank_atual, completa_predec = reprioriza_predecessoras(df, rank_coluna, rank_atual)
+            rank_atual, completa_predec = reprioriza_predecessoras(df, rank_coluna, rank_atual, rastro)
 
         # Passa para o próximo ranking caso não haja repriorização
         if not completa_predec:
@@ -262,17 +295,21 @@ def recalcula_IC(df: pd.DataFrame, eco_pot_coluna: str, p_ic_coluna: str) -> pd.
     return df
 
 
-def processa_municipios(df_ano_atual: pd.DataFrame, threshold_tir: float) -> pd.DataFrame:
+def processa_municipios(df_ano_atual: pd.DataFrame, threshold_tir: float, rastro: RastroDecisoes) -> pd.DataFrame:
     """
     Itera por municípios e busca atingir suas metas (meta_mun), seguindo a sequência de bacias de acordo com o ranking por
     municípios (rank_mun), e recalcula o índice de cobertura (ic_mun)
     """
-    print("Iterando por município")
+    logger.debug("Iterando por município")
+    rastro.contexto(escopo=ESCOPO_MUNICIPIO)
     
+    # Posições das linhas de cada município, calculadas uma única vez no ano
+    posicoes_mun = df_ano_atual.groupby(col_cod_mun, observed=True).indices
+
     # Ordena os cod_mun pelo menor rank_global (desta forma incentivamos as melhores bacias predecessoras a serem executadas primeiros, 
     # antes que outro município precise dela)
     cod_mun_order = (
-        df_ano_atual.groupby(col_cod_mun)[rank_global]
+        df_ano_atual.groupby(col_cod_mun, observed=True)[rank_global]
         .min()  # Calcula o mínimo de rank_global por cod_mun
         .sort_values()  # Ordena do menor para o maior
         .index  # Obtém os índices (cod_mun) na ordem desejada
@@ -280,26 +317,32 @@ def processa_municipios(df_ano_atual: pd.DataFrame, threshold_tir: float) -> pd.
 
     # Itera pelos cod_mun na ordem definida
     for cod_mun in cod_mun_order:
-        grupo_mun = df_ano_atual[df_ano_atual[col_cod_mun] == cod_mun].copy()
-        grupo_mun = atinge_meta(df_ano_atual, grupo_mun, meta_mun, ic_mun, rank_mun, eco_pot_mun, threshold_tir)
+        posicoes = posicoes_mun[cod_mun]
+        grupo_mun = df_ano_atual.iloc[posicoes].copy()
+        rastro.contexto(grupo=cod_mun)
+        grupo_mun = atinge_meta(df_ano_atual, grupo_mun, meta_mun, ic_mun, rank_mun, eco_pot_mun, threshold_tir, rastro)
         grupo_mun = recalcula_IC(grupo_mun, eco_pot_mun, ic_mun)
-        df_ano_atual.update(grupo_mun)
+        escreve_posicoes(df_ano_atual, grupo_mun, posicoes, COLUNAS_GRUPO + [ic_mun])
 
     return df_ano_atual
 
 
-def processa_blocos(df_ano_atual: pd.DataFrame, threshold_tir: float) -> pd.DataFrame:
+def processa_blocos(df_ano_atual: pd.DataFrame, threshold_tir: float, rastro: RastroDecisoes) -> pd.DataFrame:
     """
     Itera por blocos, primeiro recalcula índice de cobertura (ic_blo) após a iteração por municípios, depois busca atingir suas 
     metas (meta_bloco) seguindo a sequência de bacias de acordo com o ranking por blocos (rank_bloco), e por último atualiza 
     novamente o índice de cobertura
     """
-    print("Iterando por bloco")
+    logger.debug("Iterando por bloco")
+    rastro.contexto(escopo=ESCOPO_BLOCO)
+
+    # Posições das linhas de cada bloco, calculadas uma única vez no ano
+    posicoes_bloco = df_ano_atual.groupby(col_bloco, observed=True).indices
 
     # Ordena os blocos pelo menor rank_global (desta forma incentivamos as melhores bacias predecessoras a serem executadas primeiros, 
     # antes que outro bloco precise dela)
     bloco_order = (
-        df_ano_atual.groupby(col_bloco)[rank_global]
+        df_ano_atual.groupby(col_bloco, observed=True)[rank_global]
         .min()  # Calcula o mínimo de rank_global por bloco
         .sort_values()  # Ordena do menor para o maior
         .index  # Obtém os índices (blocos) na ordem desejada
@@ -307,25 +350,28 @@ def processa_blocos(df_ano_atual: pd.DataFrame, threshold_tir: float) -> pd.Data
 
     # Itera pelos bloco na ordem definida
     for bloco in bloco_order:
-        grupo_bloco = df_ano_atual[df_ano_atual[col_bloco] == bloco].copy()
+        posicoes = posicoes_bloco[bloco]
+        grupo_bloco = df_ano_atual.iloc[posicoes].copy()
         grupo_bloco = recalcula_IC(grupo_bloco, eco_pot_blo, ic_blo)
-        grupo_bloco = atinge_meta(df_ano_atual, grupo_bloco, meta_bloco, ic_blo, rank_bloco, eco_pot_blo, threshold_tir)
+        rastro.contexto(grupo=bloco)
+        grupo_bloco = atinge_meta(df_ano_atual, grupo_bloco, meta_bloco, ic_blo, rank_bloco, eco_pot_blo, threshold_tir, rastro)
         grupo_bloco = recalcula_IC(grupo_bloco, eco_pot_blo, ic_blo)
-        df_ano_atual.update(grupo_bloco)
+        escreve_posicoes(df_ano_atual, grupo_bloco, posicoes, COLUNAS_GRUPO + [ic_blo])
 
     return df_ano_atual
 
 
-def processa_global(df_ano_atual: pd.DataFrame, threshold_tir: float) -> pd.DataFrame:
+def processa_global(df_ano_atual: pd.DataFrame, threshold_tir: float, rastro: RastroDecisoes) -> pd.DataFrame:
     """
     Agora de forma global, primeiro recalcula índice de cobertura (ic_glo) após a iteração por blocos, depois busca atingir suas 
     metas (meta_global) seguindo a sequência de bacias de acordo com o ranking global (rank_global), e por último atualiza 
     novamente o índice de cobertura
     """
-    print("Iteração global")
+    logger.debug("Iteração global")
+    rastro.contexto(escopo=ESCOPO_GLOBAL, grupo=ESCOPO_GLOBAL)
 
     df_ano_atual = recalcula_IC(df_ano_atual, eco_pot_glo, ic_glo)
-    df_ano_atual = atinge_meta(df_ano_atual, df_ano_atual, meta_global, ic_glo, rank_global, eco_pot_glo, threshold_tir)
+    df_ano_atual = atinge_meta(df_ano_atual, df_ano_atual, meta_global, ic_glo, rank_global, eco_pot_glo, threshold_tir, rastro)
     df_ano_atual = recalcula_IC(df_ano_atual, eco_pot_glo, ic_glo)
 
     return df_ano_atual
@@ -354,48 +400,167 @@ def atualiza_ICs_ano(df: pd.DataFrame) -> pd.DataFrame:
     Recalcula ic_mun e ic_blo após atingimento de todas as metas no ano atual, iterando por todos os municípios e blocos
     É necessário atualizar o índice de município após atingimento de meta de bloco e geral, assim como atualizar o índice de bloco após atingimento de meta geral
     '''
-    for cod_mun, grupo_mun in df.groupby(col_cod_mun):
-        grupo_mun = recalcula_IC(grupo_mun, eco_pot_mun, ic_mun)
-        df.update(grupo_mun)
+    eco_fact = df[eco_fact_bac].to_numpy(dtype=float)
 
-    for bloco, grupo_bloco in df.groupby(col_bloco):
-        grupo_bloco = recalcula_IC(grupo_bloco, eco_pot_blo, ic_blo)
-        df.update(grupo_bloco)
+    for coluna_grupo, eco_pot_coluna, p_ic_coluna in [(col_cod_mun, eco_pot_mun, ic_mun), (col_bloco, eco_pot_blo, ic_blo)]:
+        # Soma das economias factíveis por grupo em uma passada, dividida pelas economias potenciais da primeira linha do grupo
+        codigos, n_grupos = codifica_grupos(df, [coluna_grupo])
+        soma = soma_por_grupo(codigos, eco_fact, n_grupos)
+        eco_pot_grupo = df[eco_pot_coluna].to_numpy(dtype=float)[primeira_linha_por_grupo(codigos, n_grupos)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            valor = espalha_por_grupo(codigos, soma / eco_pot_grupo)
+        df[p_ic_coluna] = np.where(np.isnan(valor), df[p_ic_coluna].to_numpy(dtype=float), valor)
 
     return df
 
 
-def prioriza_bacias(df: pd.DataFrame, parametros: pd.DataFrame) -> pd.DataFrame:
+def simula_por_ano_referencia(df: pd.DataFrame, ano_inicio_capex: int, threshold_tir: float, rastro: RastroDecisoes = None,
+                              n_processos: int = 1, retomada: tuple = None) -> Iterator[tuple]:
     """
-    Principal função do pipeline. Usa como input o dataframe 'df' que é o 'input_pre_processado' do pipeline de 'data_processing' para iterar pelo anos de 
-    projeto a partir do ano 2 (ano_inicio_capex). Para cada ano traz os resultados obtidos do ano anterior, itera sobre os municípios, blocos e global 
-    para atingir suas metas respectivas, de acordo com as alterações nos índices de cobertura das bacias a serem priorizadas e 
-    considerando os rankings definidos anteriormente.
-    
-    O input 'parametros' traz as variaveis ano_inicio_capex e threshold_tir
+    Implementação de referência em pandas da simulação ano a ano, mantida para validar o motor em arrays (simulador.py).
+    Para cada ano traz os resultados obtidos do ano anterior, itera sobre os municípios, blocos e global para atingir
+    suas metas e atualiza os ICs. As decisões são registradas no 'rastro', quando ativo.
+
+    Entrega os anos como o simula_por_ano, com os mesmos argumentos: (ano, posicoes, estado) ao fim de cada ano e a
+    'retomada' (ano, estado) para continuar uma simulação interrompida. É sempre sequencial ('n_processos' é ignorado)
     """
-    # Inicializa os parâmetros ano_inicio_capex e threshold_tir (valores únicos) vindos do input_parametros.xlsx
-    ano_inicio_capex = parametros[col_ano_inicio].iloc[0]
-    threshold_tir = parametros[col_threshold_tir].iloc[0]
+    rastro = RastroDecisoes() if rastro is None else rastro
+    if n_processos > 1:
+        logger.info("O motor de referência é sequencial; n_processos=%s ignorado", n_processos)
 
     # As obras de Capex geralmente se iniciam a partir do segundo ano
-    df_ano = df[df[col_ano] >= ano_inicio_capex].copy()
+    posicoes_capex = np.flatnonzero(df[col_ano].to_numpy() >= ano_inicio_capex)
+    df_ano = df.iloc[posicoes_capex].copy()
     df_resultados_ano = df_ano.copy()
 
+    # Posições das linhas de cada ano em df_resultados_ano
+    posicoes_ano = df_resultados_ano.groupby(col_ano).indices
+
+    ultimo_ano = None
+    if retomada is not None:
+        ultimo_ano, estado = retomada
+        for coluna, valores in estado.items():
+            df_resultados_ano.iloc[posicoes_ano[ultimo_ano], df_resultados_ano.columns.get_loc(coluna)] = valores
+
     # Itera sobre os anos e chama as funções que atingem as metas de município, bloco e geral e atualiza os ICs, ano a ano
     for ano in sorted(df_ano[col_ano].unique()):
-        print("Processando ano:", ano)
+        if ultimo_ano is not None and ano <= ultimo_ano:
+            continue
+        logger.info("Processando ano: %s", ano)
+        rastro.contexto(ano=ano)
         df_ano_atual = resultados_ano_anterior(df_resultados_ano, ano, ano_inicio_capex)
-        df_ano_atual = processa_municipios(df_ano_atual, threshold_tir)
-        df_ano_atual = processa_blocos(df_ano_atual, threshold_tir)
-        df_ano_atual = processa_global(df_ano_atual, threshold_tir)
+        df_ano_atual = processa_municipios(df_ano_atual, threshold_tir, rastro)
+        df_ano_atual = processa_blocos(df_ano_atual, threshold_tir, rastro)
+        df_ano_atual = processa_global(df_ano_atual, threshold_tir, rastro)
         df_ano_atual = atualiza_ICs_ano(df_ano_atual)
-        df_resultados_ano.update(df_ano_atual)
+        escreve_posicoes(df_resultados_ano, df_ano_atual, posicoes_ano[ano], COLUNAS_ESTADO)
+
+        linhas = df_resultados_ano.iloc[posicoes_ano[ano]]
+        yield ano, posicoes_capex[posicoes_ano[ano]], {coluna: linhas[coluna].to_numpy(dtype=float, copy=True) for coluna in COLUNAS_ESTADO}
+
+
+def simula_priorizacao_referencia(df: pd.DataFrame, ano_inicio_capex: int, threshold_tir: float, rastro: RastroDecisoes = None) -> pd.DataFrame:
+    """
+    Simulação completa pela implementação de referência (ver simula_por_ano_referencia), com o 'df' atualizado
+    """
+    return aplica_anos(df, simula_por_ano_referencia(df, ano_inicio_capex, threshold_tir, rastro))
 
-    df.update(df_resultados_ano)
+
+# Motores da simulação, escolhidos por params:simulacao.motor. Todos entregam os anos como o simula_por_ano e aceitam
+# os mesmos argumentos
+MOTORES_SIMULACAO = {
+    "referencia": simula_por_ano_referencia,
+    "arrays": simula_por_ano,
+    "compilado": partial(simula_por_ano, compilado=True),
+}
+
+
+def simula_anos(df: pd.DataFrame, ano_inicio_capex: int, threshold_tir: float, rastro: RastroDecisoes, simulacao: dict = None) -> Iterator[tuple]:
+    """
+    Anos simulados (ver simula_por_ano) com a configuração de params:simulacao: o motor (MOTORES_SIMULACAO, padrão
+    'arrays'), n_processos e, se houver checkpoint.diretorio, checkpoint de cada ano concluído e retomada
+    (checkpoint.retomar)
+    """
+    simulacao = simulacao or {}
+    nome_motor = simulacao.get("motor") or "arrays"
+    if nome_motor not in MOTORES_SIMULACAO:
+        raise ValueError(f"Motor de simulação '{nome_motor}' desconhecido; opções: {', '.join(MOTORES_SIMULACAO)}")
+    motor = MOTORES_SIMULACAO[nome_motor]
+    logger.info("Motor de simulação: %s", nome_motor)
+
+    n_processos = simulacao.get("n_processos") or 1
+    checkpoint = simulacao.get("checkpoint") or {}
+    if checkpoint.get("diretorio"):
+        return simula_com_checkpoint(df, ano_inicio_capex, threshold_tir, rastro, n_processos, checkpoint["diretorio"],
+                                     retomar=checkpoint.get("retomar", False), motor=motor, nome_motor=nome_motor)
+    return motor(df, ano_inicio_capex, threshold_tir, rastro, n_processos)
+
+
+def prioriza_bacias(df: pd.DataFrame, parametros: pd.DataFrame, simulacao: dict = None) -> pd.DataFrame:
+    """
+    Principal função do pipeline. Usa como input o dataframe 'df' que é o 'input_pre_processado' do pipeline de 'data_processing' para iterar pelo anos de 
+    projeto a partir do ano 2 (ano_inicio_capex). Para cada ano traz os resultados obtidos do ano anterior, itera sobre os municípios, blocos e global 
+    para atingir suas metas respectivas, de acordo com as alterações nos índices de cobertura das bacias a serem priorizadas e 
+    considerando os rankings definidos anteriormente.
+
+    A simulação roda no motor escolhido em params:simulacao.motor: 'arrays' (padrão, simulador.py), em que o DataFrame
+    é usado apenas na entrada e na saída, 'compilado', o mesmo motor com o laço do atinge_meta compilado pelo numba
+    (nucleo.py), ou 'referencia', a implementação pandas deste módulo, todos com as mesmas regras.
+    
+    O input 'parametros' traz as variaveis ano_inicio_capex e threshold_tir, e o 'simulacao' (params:simulacao) a
+    configuração do motor: n_processos para simular componentes independentes em paralelo e checkpoint (diretorio e
+    retomar) para gravar o estado de cada ano concluído e reaproveitá-lo na retomada de uma execução interrompida ou
+    quando o input muda apenas nos últimos anos (ver checkpoint.py).
+
+    Também devolve o rastro das decisões (rastro_decisoes), vazio a menos que o logger 'priorizacao_capex.rastro'
+    esteja em DEBUG no conf/logging.yml
+    """
+    # Inicializa os parâmetros ano_inicio_capex e threshold_tir (valores únicos) vindos do input_parametros.xlsx
+    ano_inicio_capex = parametros[col_ano_inicio].iloc[0]
+    threshold_tir = parametros[col_threshold_tir].iloc[0]
+
+    rastro = RastroDecisoes()
+    df = aplica_anos(df, simula_anos(df, ano_inicio_capex, threshold_tir, rastro, simulacao))
     df = round_cols(df)
 
     # Define colunas a serem exportadas na camada de Reporting
     df_report = df[[col_bacia, col_ano, ic_bac_tot]]
 
-    return df, df_report
\ No newline at end of file
+    return df, df_report, rastro.para_dataframe()
+
+
+def particao_ano(ano: int) -> str:
+    """
+    Nome da partição de um ano nos datasets particionados da saída ano a ano (ex.: ANO_0002), ordenável como texto
+    """
+    return f"{col_ano}_{int(ano):04d}"
+
+
+def prioriza_bacias_por_ano(df: pd.DataFrame, parametros: pd.DataFrame, simulacao: dict = None) -> Iterator[tuple]:
+    """
+    Versão em fluxo do prioriza_bacias: entrega cada ano assim que a simulação dele termina, como uma partição
+    (ver particao_ano) de bacias_priorizadas, dataset_resumo e rastro_decisoes. Os anos anteriores ao ano_inicio_capex
+    saem sem alteração, antes dos demais.
+
+    Só o estado do ano anterior e o ano em processamento ficam em memória, e cada ano já está gravado quando o próximo
+    começa. Concatenadas em ordem, as partições são iguais às saídas do prioriza_bacias
+    """
+    ano_inicio_capex = parametros[col_ano_inicio].iloc[0]
+    threshold_tir = parametros[col_threshold_tir].iloc[0]
+
+    rastro = RastroDecisoes()
+
+    def particoes(ano, df_ano):
+        df_ano = round_cols(df_ano)
+        particao = particao_ano(ano)
+        return {particao: df_ano}, {particao: df_ano[[col_bacia, col_ano, ic_bac_tot]]}, {particao: rastro.retira()}
+
+    anos = df[col_ano]
+    for ano in sorted(anos[anos < ano_inicio_capex].unique()):
+        yield particoes(ano, df[anos == ano].copy())
+
+    for ano, posicoes, estado in simula_anos(df, ano_inicio_capex, threshold_tir, rastro, simulacao):
+        df_ano = df.iloc[posicoes].copy()
+        for coluna, valores in estado.items():
+            df_ano[coluna] = valores
+        yield particoes(ano, df_ano)
@@ -0,0 +1,184 @@
+"""
+Núcleo compilado do atinge_meta do motor em arrays (simulador.py).
+
+O laço do atinge_meta é sequencial e escalar: consome as economias factíveis rank a rank, verifica a habilitação pela
+predecessora, procura bacias habilitadas a repriorizar e atualiza o ic_bac_tot. Aqui ele é escrito como laços simples
+sobre arrays de um grupo, compilados em modo nopython pelo numba quando ele está instalado (pip install
+priorizacao_capex[compilado]). As regras e a ordem das operações são as mesmas de SimuladorAno.atinge_meta, e o resultado
+é idêntico.
+
+Sem o numba, as funções continuam válidas em Python puro (lentas, usadas apenas para validar o núcleo nos testes), e o
+motor 'compilado' volta ao atinge_meta vetorizado em NumPy do SimuladorAno.
+
+O núcleo não levanta exceções nem registra o rastro: devolve um código de situação (SITUACAO_*) com a posição da bacia
+envolvida e os eventos do rastro como pares (EVENTO_*, posição no grupo), na ordem em que ocorreram.
+"""
+import numpy as np
+from priorizacao_capex.objects.utils.enums import *
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+NUMBA_DISPONIVEL = numba is not None
+
+# Situação ao fim do núcleo
+SITUACAO_OK = 0
+SITUACAO_RANK_INEXISTENTE = 1
+SITUACAO_PREDECESSORA_INEXISTENTE = 2
+SITUACAO_REPRIORIZACAO_INDEFINIDA = 3
+
+# Eventos do rastro, pela posição em EVENTOS
+EVENTOS = [EventosRastro.nao_habilitada, EventosRastro.habilitada_repriorizada, EventosRastro.execucao_integral,
+           EventosRastro.predecessora_completa, EventosRastro.predecessora_repriorizada]
+EVENTO_NAO_HABILITADA = 0
+EVENTO_HABILITADA_REPRIORIZADA = 1
+EVENTO_EXECUCAO_INTEGRAL = 2
+EVENTO_PREDECESSORA_COMPLETA = 3
+EVENTO_PREDECESSORA_REPRIORIZADA = 4
+
+
+def _compila(funcao):
+    return numba.njit(cache=True)(funcao) if NUMBA_DISPONIVEL else funcao
+
+
+@_compila
+def _anota(eventos, n_eventos, registra, evento, posicao):
+    """
+    Acrescenta o evento ao buffer (dobrando-o quando cheio) e devolve o buffer e o novo número de eventos
+    """
+    if not registra:
+        return eventos, n_eventos
+    if n_eventos == eventos.shape[0]:
+        maior = np.empty((2 * eventos.shape[0], 2), dtype=np.int64)
+        maior[:n_eventos] = eventos[:n_eventos]
+        eventos = maior
+    eventos[n_eventos, 0] = evento
+    eventos[n_eventos, 1] = posicao
+    return eventos, n_eventos + 1
+
+
+@_compila
+def _busca(valores, n, valor):
+    """
+    Primeira posição entre as 'n' primeiras de 'valores' (ordenados) com valores[j] >= valor (np.searchsorted, side='left')
+    """
+    inicio, fim = 0, n
+    while inicio < fim:
+        meio = (inicio + fim) // 2
+        if valores[meio] < valor:
+            inicio = meio + 1
+        else:
+            fim = meio
+    return inicio
+
+
+@_compila
+def _habilitada(k, ic_tot, predec_local, exec_predec):
+    """
+    A bacia 'k' pode ser repriorizada: ic_bac_tot diferente de 1 e predecessora no grupo, se houver, com ic_bac_tot
+    >= EXEC_PREDEC
+    """
+    p = predec_local[k]
+    return ic_tot[k] != 1 and (p < 0 or ic_tot[p] >= exec_predec[p])
+
+
+@_compila
+def atinge_meta_nucleo(var_eco_coluna, threshold_tir, rank_max, pos_por_rank, ranks, rank_economico, ordem_economica,
+                       rank_economico_ordenado, predec_local, linhas, predec_ano, ic_bac_tot_ano, exec_predec_ano, exec_predec,
+                       tir, eco_pot, eco_fact, ic_tot, fila_posicoes, fila_rank_economico, fila_ranks, registra):
+    """
+    Laço do atinge_meta sobre os arrays de um grupo (posições no grupo, exceto 'linhas', 'predec_ano', 'ic_bac_tot_ano'
+    e 'exec_predec_ano', que são do ano). Atualiza 'ic_tot' in-place; a fila de predecessoras pendentes
+    (PredecessorasPendentes) é consumida in-place.
+
+    Retorna (situacao, posicao, eventos, n_eventos)
+    """
+    flag = (exec_predec < 1.0) & (ic_tot < 1.0)
+    n_fila = fila_posicoes.shape[0]
+    eventos = np.empty((16, 2), dtype=np.int64)
+    n_eventos = 0
+    completa_predec = False
+
+    rank_atual = 1
+    while np.rint(var_eco_coluna) > 0 and rank_atual <= rank_max:
+        i = pos_por_rank[rank_atual] if 0 <= rank_atual < pos_por_rank.shape[0] else -1
+        if i < 0:
+            return SITUACAO_RANK_INEXISTENTE, rank_atual, eventos, n_eventos
+
+        # Habilitação pela predecessora, mesmo que em outro grupo (lida do estado do ano)
+        p = predec_ano[linhas[i]]
+        if p == -2:
+            return SITUACAO_PREDECESSORA_INEXISTENTE, i, eventos, n_eventos
+        if p >= 0 and not ic_bac_tot_ano[p] >= exec_predec_ano[p]:
+            rank_atual += 1
+            eventos, n_eventos = _anota(eventos, n_eventos, registra, EVENTO_NAO_HABILITADA, i)
+            continue
+
+        # verifica_bacia_habilitada: primeira bacia habilitada com RANK_ECONOMICO melhor que o de 'i'
+        k = -1
+        if flag[i]:
+            corte = _busca(rank_economico_ordenado, rank_economico_ordenado.shape[0], rank_economico[i])
+            for j in range(corte):
+                candidata = ordem_economica[j]
+                if _habilitada(candidata, ic_tot, predec_local, exec_predec) and ranks[candidata] > ranks[i] and predec_local[candidata] != i:
+                    if tir[candidata] >= tir[i] + 0.1:
+                        k = candidata
+                        eventos, n_eventos = _anota(eventos, n_eventos, registra, EVENTO_HABILITADA_REPRIORIZADA, k)
+                    break
+
+        # processa_economias_bacia da habilitada, se houver, ou da bacia do rank atual
+        b = k if k >= 0 else i
+        exec_b = exec_predec[b]
+        if completa_predec or (exec_b < 1.0 and tir[b] >= threshold_tir):
+            eventos, n_eventos = _anota(eventos, n_eventos, registra, EVENTO_EXECUCAO_INTEGRAL, b)
+            exec_b = 1.0
+        ic_antes, var_antes = ic_tot[b], var_eco_coluna
+        var_eco_bac = (eco_pot[b] * exec_b) - eco_fact[b]
+        if 0 < var_eco_bac < var_eco_coluna:
+            ic_tot[b] = exec_b
+            var_eco_coluna -= var_eco_bac
+        elif var_eco_bac > var_eco_coluna:
+            ic_tot[b] = (eco_fact[b] + var_eco_coluna) / eco_pot[b]
+            var_eco_coluna = 0.0
+
+        if k >= 0:
+            if var_eco_coluna == var_antes and ic_tot[k] == ic_antes:
+                return SITUACAO_REPRIORIZACAO_INDEFINIDA, k, eventos, n_eventos
+            continue
+
+        # reprioriza_predecessoras: procura na fila uma predecessora a repriorizar antes da próxima bacia do ranking
+        if np.rint(var_eco_coluna) > 0:
+            prox = pos_por_rank[rank_atual + 1] if rank_atual + 1 < pos_por_rank.shape[0] else -1
+            corte = _busca(fila_rank_economico, n_fila, rank_economico[prox]) if prox >= 0 else 0
+            fim = n_fila
+            repriorizada = -1
+            for j in range(corte):
+                if not ic_tot[fila_posicoes[j]] >= 1.0 and fila_ranks[j] <= rank_atual:
+                    fim = j
+                    repriorizada = fila_posicoes[j]
+                    break
+
+            # Retira da fila as predecessoras completas antes de 'fim', mantendo a ordem das demais
+            n_mantidas = 0
+            for j in range(n_fila):
+                if j < fim and ic_tot[fila_posicoes[j]] >= 1.0:
+                    flag[fila_posicoes[j]] = False
+                    eventos, n_eventos = _anota(eventos, n_eventos, registra, EVENTO_PREDECESSORA_COMPLETA, fila_posicoes[j])
+                else:
+                    fila_posicoes[n_mantidas] = fila_posicoes[j]
+                    fila_rank_economico[n_mantidas] = fila_rank_economico[j]
+                    fila_ranks[n_mantidas] = fila_ranks[j]
+                    n_mantidas += 1
+            n_fila = n_mantidas
+
+            completa_predec = repriorizada >= 0
+            if completa_predec:
+                eventos, n_eventos = _anota(eventos, n_eventos, registra, EVENTO_PREDECESSORA_REPRIORIZADA, repriorizada)
+                rank_atual = ranks[repriorizada]
+
+        if not completa_predec:
+            rank_atual += 1
+
+    return SITUACAO_OK, -1, eventos, n_eventos
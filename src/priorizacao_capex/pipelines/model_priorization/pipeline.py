@@ -1,6 +1,6 @@
 from kedro.pipeline import Pipeline, node, pipeline
 
-from .nodes import prioriza_bacias
+from .nodes import prioriza_bacias, prioriza_bacias_por_ano
 
 
 def create_pipeline(**kwargs) -> Pipeline:
@@ -8,8 +8,20 @@ def create_pipeline(**kwargs) -> Pipeline:
         [
             node(
                 func=prioriza_bacias,
-                inputs=["input_pre_processado", "parametros"],
-                outputs=["bacias_priorizadas", "dataset_resumo"],
+                inputs=["input_pre_processado", "parametros", "params:simulacao"],
+                outputs=["bacias_priorizadas", "dataset_resumo", "rastro_decisoes"],
                 name="prioriza_bacias_node",
             ),
         ])
+
+
+def create_pipeline_por_ano(**kwargs) -> Pipeline:
+    return pipeline(
+        [
+            node(
+                func=prioriza_bacias_por_ano,
+                inputs=["input_pre_processado", "parametros", "params:simulacao"],
+                outputs=["bacias_priorizadas_por_ano", "dataset_resumo_por_ano", "rastro_decisoes_por_ano"],
+                name="prioriza_bacias_por_ano_node",
+            ),
+        ])
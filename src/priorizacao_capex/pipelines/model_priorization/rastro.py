@@ -0,0 +1,95 @@
+"""
+Rastro das decisões do atinge_meta (bacias não habilitadas, repriorizadas e predecessoras completadas).
+
+O rastro fica desligado por padrão e é ligado pelo nível do logger 'priorizacao_capex.rastro' no conf/logging.yml
+(DEBUG liga). Quando ligado, cada decisão é registrada como um log DEBUG e guardada em colunas, devolvidas pelo
+prioriza_bacias como o dataset 'rastro_decisoes'. Desligado, o custo por decisão é apenas o teste de 'ativo'.
+"""
+import logging
+
+import pandas as pd
+from priorizacao_capex.objects.utils.enums import *
+
+logger = logging.getLogger("priorizacao_capex.rastro")
+
+col_bacia = ColsOutros.bacia.value
+col_ano = ColsOutros.ano.value
+col_escopo = ColsRastro.escopo.value
+col_grupo = ColsRastro.grupo.value
+col_evento = ColsRastro.evento.value
+
+COLUNAS_RASTRO = [col_ano, col_escopo, col_grupo, col_evento, col_bacia]
+
+# Escopos de processamento do ano
+ESCOPO_MUNICIPIO = "MUNICIPIO"
+ESCOPO_BLOCO = "BLOCO"
+ESCOPO_GLOBAL = "GLOBAL"
+
+# Mensagem de log de cada evento
+MENSAGENS = {
+    EventosRastro.nao_habilitada: "Bacia %s não habilitada devido a IC insuficiente da predecessora",
+    EventosRastro.habilitada_repriorizada: "Bacia habilitada boa: %s sendo repriorizada",
+    EventosRastro.execucao_integral: "Reprioriza bacia predecessora: %s",
+    EventosRastro.predecessora_completa: "Bacia predecessora %s marcada como completa",
+    EventosRastro.predecessora_repriorizada: "Bacia predecessora %s repriorizada",
+}
+
+
+class RastroDecisoes:
+    """
+    Acumula as decisões da simulação em colunas, com o contexto (ano, escopo e grupo) em que foram tomadas.
+    Se 'ativo' não for informado, segue o nível do logger do rastro
+    """
+
+    def __init__(self, ativo: bool = None):
+        self.ativo = logger.isEnabledFor(logging.DEBUG) if ativo is None else ativo
+        self.colunas = {coluna: [] for coluna in COLUNAS_RASTRO}
+        self.ano = None
+        self.escopo = None
+        self.grupo = None
+
+    def contexto(self, ano=None, escopo: str = None, grupo=None) -> None:
+        """
+        Atualiza o contexto das próximas decisões. Informar o escopo reinicia o grupo
+        """
+        if ano is not None:
+            self.ano = ano
+        if escopo is not None:
+            self.escopo = escopo
+            self.grupo = None
+        if grupo is not None:
+            self.grupo = grupo
+
+    def registra(self, evento: EventosRastro, bacia) -> None:
+        if not self.ativo:
+            return
+        logger.debug(MENSAGENS[evento], bacia)
+        for coluna, valor in zip(COLUNAS_RASTRO, [self.ano, self.escopo, self.grupo, evento.value, bacia]):
+            self.colunas[coluna].append(valor)
+
+    def anexa(self, decisao: tuple) -> None:
+        """
+        Acrescenta uma decisão já registrada em outro rastro (valores na ordem de COLUNAS_RASTRO)
+        """
+        for coluna, valor in zip(COLUNAS_RASTRO, decisao):
+            self.colunas[coluna].append(valor)
+
+    def __len__(self) -> int:
+        return len(self.colunas[col_ano])
+
+    def para_dataframe(self, inicio: int = 0) -> pd.DataFrame:
+        """
+        Rastro em um DataFrame, na ordem das decisões, a partir da decisão 'inicio'. O grupo é guardado como texto
+        (código do município, bloco ou GLOBAL) para manter a coluna com um único tipo
+        """
+        df = pd.DataFrame({coluna: valores[inicio:] for coluna, valores in self.colunas.items()}, columns=COLUNAS_RASTRO)
+        df[col_grupo] = df[col_grupo].astype(str)
+        return df
+
+    def retira(self) -> pd.DataFrame:
+        """
+        Rastro acumulado até aqui (ver para_dataframe), esvaziando as colunas. Usado na saída ano a ano
+        """
+        df = self.para_dataframe()
+        self.colunas = {coluna: [] for coluna in COLUNAS_RASTRO}
+        return df
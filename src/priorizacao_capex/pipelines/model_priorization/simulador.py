@@ -0,0 +1,776 @@
+"""
+Motor de simulação do prioriza_bacias em arrays NumPy.
+
+Reproduz exatamente as regras do atinge_meta, processa_municipios, processa_blocos, processa_global e atualiza_ICs_ano
+de nodes.py, mas mantém o estado de cada ano em arrays contíguos indexados pela posição da bacia no ano, com tabelas
+ranking -> linha pré-calculadas para cada município, bloco e para o escopo global. O DataFrame é usado apenas na
+entrada e na saída (simula_priorizacao).
+"""
+import logging
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from priorizacao_capex.objects.utils.enums import *
+from priorizacao_capex.objects.utils.grupos import codifica_grupos, espalha_por_grupo, primeira_linha_por_grupo, soma_por_grupo
+from priorizacao_capex.objects.utils.metricas import cronometra
+
+from .nucleo import (
+    EVENTOS,
+    NUMBA_DISPONIVEL,
+    SITUACAO_PREDECESSORA_INEXISTENTE,
+    SITUACAO_RANK_INEXISTENTE,
+    SITUACAO_REPRIORIZACAO_INDEFINIDA,
+    atinge_meta_nucleo,
+)
+from .rastro import ESCOPO_BLOCO, ESCOPO_GLOBAL, ESCOPO_MUNICIPIO, RastroDecisoes
+
+logger = logging.getLogger(__name__)
+
+# Definindo atalhos para captar os nomes de colunas por meio do Enums
+col_bacia = ColsOutros.bacia.value
+col_cod_mun = ColsOutros.cod_mun.value
+col_bloco = ColsOutros.bloco.value
+col_tir = ColsOutros.tir.value
+col_ano = ColsOutros.ano.value
+col_exec_predec = ColsOutros.exec_predec.value
+col_bacia_predec = ColsOutros.bacia_predec.value
+
+ic_bac = ColsIC.ic_bac.value
+ic_mun = ColsIC.ic_mun.value
+ic_blo = ColsIC.ic_blo.value
+ic_glo = ColsIC.ic_glo.value
+ic_bac_tot = ColsIC.ic_bac_tot.value
+
+eco_pot = ColsEco.eco_pot.value
+eco_incr_conced = ColsEco.eco_incr_conced.value
+eco_pot_mun = ColsEco.eco_pot_mun.value
+eco_pot_blo = ColsEco.eco_pot_blo.value
+eco_pot_glo = ColsEco.eco_pot_glo.value
+eco_fact_bac = ColsEco.eco_fact_bac.value
+
+meta_mun = ColsMetas.meta_mun.value
+meta_bloco = ColsMetas.meta_bloco.value
+meta_global = ColsMetas.meta_global.value
+
+rank_economico = ColsRanks.rank_economico.value
+rank_mun = ColsRanks.rank_mun.value
+rank_bloco = ColsRanks.rank_bloco.value
+rank_global = ColsRanks.rank_global.value
+
+# Colunas alteradas pela simulação, na ordem em que são devolvidas ao DataFrame
+COLUNAS_ESTADO = [ic_bac, eco_fact_bac, ic_bac_tot, ic_mun, ic_blo, ic_glo]
+
+
+def _max(valores: np.ndarray) -> float:
+    """
+    Máximo ignorando NaN, como o Series.max() do pandas
+    """
+    valores = valores[~np.isnan(valores)]
+    return valores.max() if len(valores) else np.nan
+
+
+def _atribui(destino: np.ndarray, linhas: np.ndarray, valores: np.ndarray) -> None:
+    """
+    Escreve 'valores' nas 'linhas' de 'destino' ignorando NaN, com a mesma semântica do DataFrame.update
+    """
+    validos = ~np.isnan(valores)
+    destino[linhas[validos]] = valores[validos]
+
+
+class SomaCorrente:
+    """
+    Somas correntes das economias factíveis por agrupamento de um escopo (municípios, blocos ou global).
+
+    As somas são montadas uma vez a partir do estado do ano e depois mantidas por deltas a cada bacia cujo eco_fact_bac
+    muda, com compensação de Neumaier para não acumular erro de arredondamento. Assim o índice de cobertura de qualquer
+    agrupamento é lido em O(1), sem somar novamente todas as bacias. Linhas sem agrupamento (código -1) são ignoradas
+    """
+
+    def __init__(self, codigos: np.ndarray, n_grupos: int, eco_fact: np.ndarray):
+        self.codigos = codigos
+        self.n_grupos = n_grupos
+        self.reinicia(eco_fact)
+
+    def reinicia(self, eco_fact: np.ndarray) -> None:
+        self.total = soma_por_grupo(self.codigos, eco_fact, self.n_grupos)
+        self.compensacao = np.zeros(self.n_grupos)
+
+    def aplica(self, linhas: np.ndarray, antes: np.ndarray, depois: np.ndarray) -> None:
+        """
+        Aplica a variação de eco_fact_bac das 'linhas' (valores NaN contam como zero, como no Series.sum())
+        """
+        antes = np.where(np.isnan(antes), 0, antes)
+        depois = np.where(np.isnan(depois), 0, depois)
+        mudou = (antes != depois) & (self.codigos[linhas] >= 0)
+        for codigo, valor_antes, valor_depois in zip(self.codigos[linhas[mudou]], antes[mudou], depois[mudou]):
+            self._acumula(codigo, -valor_antes)
+            self._acumula(codigo, valor_depois)
+
+    def _acumula(self, codigo: int, valor: float) -> None:
+        total = self.total[codigo]
+        novo = total + valor
+        if abs(total) >= abs(valor):
+            self.compensacao[codigo] += (total - novo) + valor
+        else:
+            self.compensacao[codigo] += (valor - novo) + total
+        self.total[codigo] = novo
+
+    def valor(self, codigo: int) -> float:
+        return self.total[codigo] + self.compensacao[codigo]
+
+    def valores(self) -> np.ndarray:
+        return self.total + self.compensacao
+
+
+class Grupo:
+    """
+    Agrupamento de bacias (um município, um bloco ou o escopo global) com as suas tabelas pré-calculadas: as linhas do
+    ano que pertencem ao grupo (na ordem do DataFrame), o seu código no escopo, a tabela ranking -> posição no grupo, a
+    posição de cada predecessora dentro do grupo (-1 quando não há predecessora ou ela está fora do grupo), a ordem das
+    bacias por RANK_ECONOMICO e a lista de sucessoras de cada bacia dentro do grupo
+    """
+
+    def __init__(self, codigo: int, linhas: np.ndarray, ranks: np.ndarray, predec: np.ndarray, posicao_no_ano: np.ndarray, rank_economico: np.ndarray):
+        self.codigo = codigo
+        self.linhas = linhas
+        self.ranks = ranks[linhas]
+        self.rank_max = self.ranks.max()
+
+        self.pos_por_rank = np.full(self.rank_max + 2, -1, dtype=np.int64)
+        self.pos_por_rank[self.ranks] = np.arange(len(linhas))
+
+        # Mapeia as predecessoras (posições no ano) para posições no grupo
+        posicao_no_ano[linhas] = np.arange(len(linhas))
+        predec_grupo = predec[linhas]
+        self.predec_local = np.where(predec_grupo >= 0, posicao_no_ano[np.maximum(predec_grupo, 0)], -1)
+        posicao_no_ano[linhas] = -1
+
+        # Bacias do grupo por RANK_ECONOMICO e o valor do ranking em cada posição dessa ordem
+        self.rank_economico = rank_economico[linhas]
+        self.ordem_economica = np.argsort(self.rank_economico, kind='stable')
+        self.rank_economico_ordenado = self.rank_economico[self.ordem_economica]
+        self.posicao_economica = np.empty(len(linhas), dtype=np.int64)
+        self.posicao_economica[self.ordem_economica] = np.arange(len(linhas))
+
+        # Sucessoras de cada bacia no grupo (formato CSR): sucessoras[inicio_sucessoras[k]:inicio_sucessoras[k + 1]]
+        com_predec = np.flatnonzero(self.predec_local >= 0)
+        ordem = np.argsort(self.predec_local[com_predec], kind='stable')
+        self.sucessoras = com_predec[ordem]
+        self.inicio_sucessoras = np.searchsorted(self.predec_local[self.sucessoras], np.arange(len(linhas) + 1))
+
+    def linha_do_rank(self, rank: int) -> int:
+        """
+        Posição no grupo da bacia com o ranking informado
+        """
+        pos = self.pos_por_rank[rank] if 0 <= rank < len(self.pos_por_rank) else -1
+        if pos < 0:
+            raise ValueError(f"Ranking {rank} não encontrado no agrupamento")
+        return pos
+
+
+class PredecessorasPendentes:
+    """
+    Fila das predecessoras de um grupo ainda não marcadas como completas, ordenada por RANK_ECONOMICO, com o ranking do
+    escopo de cada uma ao lado. A ordem é montada uma única vez por atinge_meta; as predecessoras completadas só saem da
+    fila quando uma varredura as encontra (remoção preguiçosa)
+    """
+
+    def __init__(self, posicoes: np.ndarray, rank_economico: np.ndarray, ranks: np.ndarray):
+        ordem = np.argsort(rank_economico[posicoes], kind='stable')
+        self.posicoes = posicoes[ordem]
+        self.rank_economico = rank_economico[self.posicoes]
+        self.ranks = ranks[self.posicoes]
+
+    def __len__(self) -> int:
+        return len(self.posicoes)
+
+    def remove(self, removidas: np.ndarray) -> None:
+        """
+        Retira da fila as entradas marcadas em 'removidas' (máscara alinhada com a fila)
+        """
+        mantidas = ~removidas
+        self.posicoes = self.posicoes[mantidas]
+        self.rank_economico = self.rank_economico[mantidas]
+        self.ranks = self.ranks[mantidas]
+
+
+def _grupos_ordenados(codigos: np.ndarray, ordem_codigos: np.ndarray, ranks: np.ndarray, predec: np.ndarray, rank_economico: np.ndarray) -> list:
+    """
+    Monta os grupos de cada código na ordem pedida, mantendo as linhas de cada grupo na ordem do DataFrame
+    """
+    ordem = np.argsort(codigos, kind='stable')
+    inicios = np.searchsorted(codigos[ordem], ordem_codigos, side='left')
+    fins = np.searchsorted(codigos[ordem], ordem_codigos, side='right')
+    posicao_no_ano = np.full(len(codigos), -1, dtype=np.int64)
+    return [Grupo(codigo, ordem[inicio:fim], ranks, predec, posicao_no_ano, rank_economico)
+            for codigo, inicio, fim in zip(ordem_codigos, inicios, fins)]
+
+
+class SimuladorAno:
+    """
+    Estado de um ano da simulação em arrays contíguos, indexados pela posição da bacia no ano.
+
+    Os atributos estáticos (rankings, TIR, EXEC_PREDEC, economias potenciais, metas) e as tabelas de cada escopo são
+    montados uma única vez por ano; os índices de cobertura e as economias factíveis são atualizados in-place. Com
+    'compilado', o laço do atinge_meta roda no núcleo de nucleo.py em vez das operações vetorizadas em NumPy.
+    """
+
+    def __init__(self, df_ano: pd.DataFrame, threshold_tir: float, rastro: RastroDecisoes, compilado: bool = False):
+        self.threshold_tir = threshold_tir
+        self.rastro = rastro
+        self.compilado = compilado
+        self.n = len(df_ano)
+
+        self.bacia = df_ano[col_bacia].to_numpy()
+        self.tir = df_ano[col_tir].to_numpy(dtype=float)
+        self.exec_predec = df_ano[col_exec_predec].to_numpy(dtype=float)
+        self.eco_pot = df_ano[eco_pot].to_numpy(dtype=float)
+        self.eco_incr_conced = df_ano[eco_incr_conced].to_numpy(dtype=float)
+        self.eco_pot_mun = df_ano[eco_pot_mun].to_numpy(dtype=float)
+        self.eco_pot_blo = df_ano[eco_pot_blo].to_numpy(dtype=float)
+        self.eco_pot_glo = df_ano[eco_pot_glo].to_numpy(dtype=float)
+        self.meta_mun = df_ano[meta_mun].to_numpy(dtype=float)
+        self.meta_bloco = df_ano[meta_bloco].to_numpy(dtype=float)
+        self.meta_global = df_ano[meta_global].to_numpy(dtype=float)
+        self.rank_economico = df_ano[rank_economico].to_numpy(dtype=np.int64)
+        self.rank_mun = df_ano[rank_mun].to_numpy(dtype=np.int64)
+        self.rank_bloco = df_ano[rank_bloco].to_numpy(dtype=np.int64)
+        self.rank_global = df_ano[rank_global].to_numpy(dtype=np.int64)
+
+        # Estado dinâmico do ano
+        self.ic_bac = df_ano[ic_bac].to_numpy(dtype=float, copy=True)
+        self.eco_fact_bac = df_ano[eco_fact_bac].to_numpy(dtype=float, copy=True)
+        self.ic_bac_tot = df_ano[ic_bac_tot].to_numpy(dtype=float, copy=True)
+        self.ic_mun = df_ano[ic_mun].to_numpy(dtype=float, copy=True)
+        self.ic_blo = df_ano[ic_blo].to_numpy(dtype=float, copy=True)
+        self.ic_glo = df_ano[ic_glo].to_numpy(dtype=float, copy=True)
+
+        # Predecessora de cada bacia como posição no ano (-1 sem predecessora, -2 predecessora inexistente no ano)
+        indice_bacias = pd.Index(self.bacia)
+        if not indice_bacias.is_unique:
+            raise ValueError("Há bacias repetidas dentro de um mesmo ano")
+        predec = df_ano[col_bacia_predec]
+        self.predec_rotulo = predec.to_numpy()
+        self.predec = np.where(predec.notna().to_numpy(), indice_bacias.get_indexer(predec), -1)
+        self.predec[predec.notna().to_numpy() & (self.predec < 0)] = -2
+
+        # Tabelas de cada escopo. Municípios e blocos são processados pelo menor RANK_GLOBAL
+        cod_mun, self.n_mun = codifica_grupos(df_ano, [col_cod_mun])
+        bloco, self.n_bloco = codifica_grupos(df_ano, [col_bloco])
+        self.cod_mun, self.bloco = cod_mun, bloco
+        self.rotulo_mun = df_ano[col_cod_mun].to_numpy()
+        self.rotulo_bloco = df_ano[col_bloco].to_numpy()
+        self.grupos_mun = _grupos_ordenados(cod_mun, self._ordem_por_rank_global(cod_mun), self.rank_mun, self.predec, self.rank_economico)
+        self.grupos_bloco = _grupos_ordenados(bloco, self._ordem_por_rank_global(bloco), self.rank_bloco, self.predec, self.rank_economico)
+        self.grupo_global = Grupo(0, np.arange(self.n), self.rank_global, self.predec, np.full(self.n, -1, dtype=np.int64), self.rank_economico)
+
+        # Somas correntes das economias factíveis de cada escopo
+        self.soma_mun = SomaCorrente(cod_mun, self.n_mun, self.eco_fact_bac)
+        self.soma_bloco = SomaCorrente(bloco, self.n_bloco, self.eco_fact_bac)
+        self.soma_glo = SomaCorrente(np.zeros(self.n, dtype=np.int64), 1, self.eco_fact_bac)
+
+    def _ordem_por_rank_global(self, codigos: np.ndarray) -> np.ndarray:
+        """
+        Códigos dos grupos ordenados pelo menor RANK_GLOBAL de cada grupo
+        """
+        validos = codigos >= 0
+        minimos = pd.Series(self.rank_global[validos]).groupby(codigos[validos]).min().sort_values()
+        return minimos.index.to_numpy()
+
+    def transfere_ano_anterior(self, anterior: dict) -> None:
+        """
+        Traz ic_bac_tot, ic_mun, ic_blo e ic_glo do estado final do ano anterior (mesmas chaves de estado(),
+        posicionalmente) e recalcula eco_fact_bac e ic_bac
+        """
+        if len(anterior[ic_bac_tot]) != self.n:
+            raise ValueError("O número de bacias muda entre anos consecutivos")
+        self.ic_bac_tot[:] = anterior[ic_bac_tot]
+        self.ic_mun[:] = anterior[ic_mun]
+        self.ic_blo[:] = anterior[ic_blo]
+        self.ic_glo[:] = anterior[ic_glo]
+        self.atualiza_bacias(np.arange(self.n), self.ic_bac_tot, self.ic_bac, self.eco_fact_bac)
+        self.reinicia_somas()
+
+    def carrega_estado(self, estado: dict) -> None:
+        """
+        Substitui o estado dinâmico do ano pelos arrays de 'estado' (mesmas chaves de estado()) e remonta as somas
+        """
+        for coluna, valores in self.estado().items():
+            valores[:] = estado[coluna]
+        self.reinicia_somas()
+
+    def reinicia_somas(self) -> None:
+        for soma in (self.soma_mun, self.soma_bloco, self.soma_glo):
+            soma.reinicia(self.eco_fact_bac)
+
+    def _escreve_eco_fact(self, linhas: np.ndarray, antes: np.ndarray, somas: tuple) -> None:
+        """
+        Propaga às 'somas' correntes a variação de eco_fact_bac das 'linhas' em relação aos valores 'antes'
+        """
+        depois = self.eco_fact_bac[linhas]
+        for soma in somas:
+            soma.aplica(linhas, antes, depois)
+
+    def atualiza_bacias(self, linhas: np.ndarray, ic_tot: np.ndarray, ic_bac_dest: np.ndarray, eco_fact_dest: np.ndarray) -> None:
+        """
+        Recalcula ic_bac e eco_fact_bac das linhas a partir do ic_bac_tot (arrays locais do grupo)
+        """
+        eco_pot_linhas = self.eco_pot[linhas]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            novo_ic_bac = (eco_pot_linhas * ic_tot - self.eco_incr_conced[linhas]) / eco_pot_linhas
+        novo_eco_fact = eco_pot_linhas * ic_tot
+        _atribui(ic_bac_dest, np.arange(len(linhas)), novo_ic_bac)
+        _atribui(eco_fact_dest, np.arange(len(linhas)), novo_eco_fact)
+
+    def habilitadas_grupo(self, grupo: Grupo, ic_tot: np.ndarray) -> np.ndarray:
+        """
+        Índice das bacias do grupo que podem ser repriorizadas (ic_bac_tot diferente de 1 e predecessora, se houver no
+        grupo, com ic_bac_tot >= EXEC_PREDEC), na ordem de RANK_ECONOMICO
+        """
+        predec_local = grupo.predec_local
+        predec_valida = np.maximum(predec_local, 0)
+        exec_predec = self.exec_predec[grupo.linhas]
+        habilitadas = (ic_tot != 1) & ((predec_local < 0) | (ic_tot[predec_valida] >= exec_predec[predec_valida]))
+        return habilitadas[grupo.ordem_economica]
+
+    def atualiza_habilitadas(self, grupo: Grupo, k: int, ic_tot: np.ndarray, habilitadas: np.ndarray) -> None:
+        """
+        Atualiza o índice de bacias habilitadas após a mudança do ic_bac_tot da bacia 'k': a própria bacia e as suas
+        sucessoras no grupo
+        """
+        afetadas = np.r_[k, grupo.sucessoras[grupo.inicio_sucessoras[k]:grupo.inicio_sucessoras[k + 1]]]
+        predec_local = grupo.predec_local[afetadas]
+        predec_valida = np.maximum(predec_local, 0)
+        exec_predec = self.exec_predec[grupo.linhas[predec_valida]]
+        habilitadas[grupo.posicao_economica[afetadas]] = (ic_tot[afetadas] != 1) \
+            & ((predec_local < 0) | (ic_tot[predec_valida] >= exec_predec))
+
+    def verifica_bacia_habilitada(self, grupo: Grupo, i: int, ic_tot: np.ndarray, flag: np.ndarray, habilitadas: np.ndarray) -> int:
+        """
+        Retorna a posição no grupo da bacia habilitada a ser repriorizada no lugar da predecessora 'i', ou -1. Percorre o
+        índice de habilitadas apenas entre as bacias com RANK_ECONOMICO melhor que o de 'i' e para na primeira válida
+        """
+        if not flag[i]:
+            return -1
+
+        corte = np.searchsorted(grupo.rank_economico_ordenado, grupo.rank_economico[i], side='left')
+        prefixo = grupo.ordem_economica[:corte]
+        validas = habilitadas[:corte] & (grupo.ranks[prefixo] > grupo.ranks[i]) & (grupo.predec_local[prefixo] != i)
+        if not validas.any():
+            return -1
+
+        k = prefixo[np.argmax(validas)]
+        linhas = grupo.linhas
+        if self.tir[linhas[k]] >= self.tir[linhas[i]] + 0.1:
+            self.rastro.registra(EventosRastro.habilitada_repriorizada, self.bacia[linhas[k]])
+            return k
+        return -1
+
+    def processa_economias_bacia(self, grupo: Grupo, k: int, ic_tot: np.ndarray, eco_fact: np.ndarray, Var_Eco_coluna: float, completa_predec: bool) -> float:
+        """
+        Consome as economias disponíveis na bacia 'k' do grupo e atualiza o seu ic_bac_tot
+        """
+        linha = grupo.linhas[k]
+        exec_predec = self.exec_predec[linha]
+        if completa_predec or (exec_predec < 1.0 and self.tir[linha] >= self.threshold_tir):
+            self.rastro.registra(EventosRastro.execucao_integral, self.bacia[linha])
+            exec_predec = 1.0
+
+        Var_Eco_Bac = (self.eco_pot[linha] * exec_predec) - eco_fact[k]
+
+        if 0 < Var_Eco_Bac < Var_Eco_coluna:
+            ic_tot[k] = exec_predec
+            Var_Eco_coluna -= Var_Eco_Bac
+        elif Var_Eco_Bac > Var_Eco_coluna:
+            ic_tot[k] = (eco_fact[k] + Var_Eco_coluna) / self.eco_pot[linha]
+            Var_Eco_coluna = 0
+
+        return Var_Eco_coluna
+
+    def reprioriza_predecessoras(self, grupo: Grupo, rank_atual: int, ic_tot: np.ndarray, flag: np.ndarray, fila: PredecessorasPendentes) -> tuple[int, bool]:
+        """
+        Procura, na fila de predecessoras pendentes (ordenada por rank_economico), alguma a ser repriorizada antes da
+        próxima bacia do ranking. Marca como completas as predecessoras com ic_bac_tot >= 1.0 encontradas no caminho
+        """
+        # Só as predecessoras com rank_economico melhor que o da próxima bacia podem ser repriorizadas
+        prox = grupo.pos_por_rank[rank_atual + 1] if rank_atual + 1 < len(grupo.pos_por_rank) else -1
+        corte = np.searchsorted(fila.rank_economico, grupo.rank_economico[prox], side='left') if prox >= 0 else 0
+        completas = ic_tot[fila.posicoes[:corte]] >= 1.0
+        elegiveis = ~completas & (fila.ranks[:corte] <= rank_atual)
+
+        if elegiveis.any():
+            fim = np.argmax(elegiveis)
+            repriorizada = fila.posicoes[fim]
+        else:
+            fim = len(fila)
+            completas = ic_tot[fila.posicoes] >= 1.0
+            repriorizada = -1
+
+        removidas = np.zeros(len(fila), dtype=bool)
+        removidas[:fim] = completas[:fim]
+        if removidas.any():
+            for k in fila.posicoes[removidas]:
+                flag[k] = False
+                self.rastro.registra(EventosRastro.predecessora_completa, self.bacia[grupo.linhas[k]])
+            fila.remove(removidas)
+
+        if repriorizada >= 0:
+            self.rastro.registra(EventosRastro.predecessora_repriorizada, self.bacia[grupo.linhas[repriorizada]])
+            return grupo.ranks[repriorizada], True
+        return rank_atual, False
+
+    def atinge_meta(self, grupo: Grupo, meta: np.ndarray, p_ic: np.ndarray, eco_pot_escopo: np.ndarray, ic_tot: np.ndarray, ic_bac_local: np.ndarray, eco_fact: np.ndarray) -> None:
+        """
+        Itera sobre as bacias do grupo, na ordem do ranking do escopo, até atingir a meta. 'p_ic', 'ic_tot',
+        'ic_bac_local' e 'eco_fact' são os arrays do grupo (cópias para município e bloco, o próprio estado no global);
+        a habilitação pela predecessora é sempre lida do estado do ano (self.ic_bac_tot)
+        """
+        linhas = grupo.linhas
+        exec_predec = self.exec_predec[linhas]
+
+        # Predecessoras ainda não completadas, ordenadas por rank_economico
+        flag = (exec_predec < 1.0) & (ic_tot < 1.0)
+        fila = PredecessorasPendentes(np.flatnonzero(flag), grupo.rank_economico, grupo.ranks)
+        Var_IC_coluna = _max(meta[linhas]) - _max(p_ic)
+        Var_Eco_coluna = Var_IC_coluna * _max(eco_pot_escopo[linhas])
+
+        if self.compilado:
+            self._atinge_meta_nucleo(grupo, Var_Eco_coluna, ic_tot, eco_fact, fila)
+            self.atualiza_bacias(linhas, ic_tot, ic_bac_local, eco_fact)
+            return
+
+        completa_predec = False
+        habilitadas = self.habilitadas_grupo(grupo, ic_tot)
+
+        rank_atual = 1
+        while round(Var_Eco_coluna, 0) > 0 and rank_atual <= grupo.rank_max:
+            i = grupo.linha_do_rank(rank_atual)
+            linha = linhas[i]
+
+            # Verifica se esta bacia está habilitada de acordo com a sua predecessora, mesmo que em outro grupo
+            p = self.predec[linha]
+            if p == -2:
+                raise ValueError(f"Bacia predecessora {self.predec_rotulo[linha]} da bacia {self.bacia[linha]} não encontrada no ano")
+            if p >= 0 and not self.ic_bac_tot[p] >= self.exec_predec[p]:
+                rank_atual += 1
+                self.rastro.registra(EventosRastro.nao_habilitada, self.bacia[linha])
+                continue
+
+            # Se houver uma bacia habilitada boa o suficiente, prioriza a execução dela e volta ao mesmo rank_atual
+            k = self.verifica_bacia_habilitada(grupo, i, ic_tot, flag, habilitadas)
+            if k >= 0:
+                ic_antes, Var_antes = ic_tot[k], Var_Eco_coluna
+                Var_Eco_coluna = self.processa_economias_bacia(grupo, k, ic_tot, eco_fact, Var_Eco_coluna, completa_predec)
+                self.atualiza_habilitadas(grupo, k, ic_tot, habilitadas)
+                if Var_Eco_coluna == Var_antes and ic_tot[k] == ic_antes:
+                    raise RuntimeError(f"Bacia habilitada {self.bacia[linhas[k]]} não tem economias disponíveis e seria repriorizada indefinidamente")
+                continue
+
+            Var_Eco_coluna = self.processa_economias_bacia(grupo, i, ic_tot, eco_fact, Var_Eco_coluna, completa_predec)
+            self.atualiza_habilitadas(grupo, i, ic_tot, habilitadas)
+
+            # Caso necessário, retornar às bacias predecessoras e verificar repriorização caso vantajoso
+            if round(Var_Eco_coluna, 0) > 0:
+                rank_atual, completa_predec = self.reprioriza_predecessoras(grupo, rank_atual, ic_tot, flag, fila)
+
+            if not completa_predec:
+                rank_atual += 1
+
+        self.atualiza_bacias(linhas, ic_tot, ic_bac_local, eco_fact)
+
+    def _atinge_meta_nucleo(self, grupo: Grupo, Var_Eco_coluna: float, ic_tot: np.ndarray, eco_fact: np.ndarray, fila: PredecessorasPendentes) -> None:
+        """
+        Laço do atinge_meta no núcleo de nucleo.py: registra no rastro os eventos devolvidos e levanta os mesmos erros
+        do laço em NumPy
+        """
+        linhas = grupo.linhas
+        situacao, posicao, eventos, n_eventos = atinge_meta_nucleo(
+            float(Var_Eco_coluna), float(self.threshold_tir), int(grupo.rank_max), grupo.pos_por_rank, grupo.ranks,
+            grupo.rank_economico, grupo.ordem_economica, grupo.rank_economico_ordenado, grupo.predec_local, linhas,
+            self.predec, self.ic_bac_tot, self.exec_predec, self.exec_predec[linhas], self.tir[linhas], self.eco_pot[linhas],
+            eco_fact, ic_tot, fila.posicoes.copy(), fila.rank_economico.copy(), fila.ranks.copy(), self.rastro.ativo)
+
+        for evento, k in eventos[:n_eventos]:
+            self.rastro.registra(EVENTOS[evento], self.bacia[linhas[k]])
+
+        if situacao == SITUACAO_RANK_INEXISTENTE:
+            raise ValueError(f"Ranking {posicao} não encontrado no agrupamento")
+        if situacao == SITUACAO_PREDECESSORA_INEXISTENTE:
+            linha = linhas[posicao]
+            raise ValueError(f"Bacia predecessora {self.predec_rotulo[linha]} da bacia {self.bacia[linha]} não encontrada no ano")
+        if situacao == SITUACAO_REPRIORIZACAO_INDEFINIDA:
+            raise RuntimeError(f"Bacia habilitada {self.bacia[linhas[posicao]]} não tem economias disponíveis e seria repriorizada indefinidamente")
+
+    def recalcula_IC(self, grupo: Grupo, soma: SomaCorrente, eco_pot_escopo: np.ndarray) -> float:
+        """
+        Índice de cobertura do agrupamento: soma das economias factíveis sobre as economias potenciais do agrupamento
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return soma.valor(grupo.codigo) / eco_pot_escopo[grupo.linhas[0]]
+
+    def _processa_grupo(self, grupo: Grupo, meta: np.ndarray, p_ic_ano: np.ndarray, eco_pot_escopo: np.ndarray, soma: SomaCorrente, recalcula_antes: bool) -> None:
+        """
+        Processa um município ou bloco sobre cópias das suas linhas e devolve o resultado ao estado do ano
+        """
+        linhas = grupo.linhas
+        ic_tot = self.ic_bac_tot[linhas].copy()
+        ic_bac_local = self.ic_bac[linhas].copy()
+        eco_fact = self.eco_fact_bac[linhas].copy()
+        p_ic = p_ic_ano[linhas].copy()
+
+        if recalcula_antes:
+            p_ic[:] = self.recalcula_IC(grupo, soma, eco_pot_escopo)
+        self.atinge_meta(grupo, meta, p_ic, eco_pot_escopo, ic_tot, ic_bac_local, eco_fact)
+
+        antes = self.eco_fact_bac[linhas].copy()
+        _atribui(self.ic_bac_tot, linhas, ic_tot)
+        _atribui(self.ic_bac, linhas, ic_bac_local)
+        _atribui(self.eco_fact_bac, linhas, eco_fact)
+        self._escreve_eco_fact(linhas, antes, (self.soma_mun, self.soma_bloco))
+
+        p_ic[:] = self.recalcula_IC(grupo, soma, eco_pot_escopo)
+        _atribui(p_ic_ano, linhas, p_ic)
+
+    def processa_municipios(self) -> None:
+        logger.debug("Iterando por município")
+        self.rastro.contexto(escopo=ESCOPO_MUNICIPIO)
+        for grupo in self.grupos_mun:
+            self.rastro.contexto(grupo=self.rotulo_mun[grupo.linhas[0]])
+            self._processa_grupo(grupo, self.meta_mun, self.ic_mun, self.eco_pot_mun, self.soma_mun, recalcula_antes=False)
+
+    def processa_blocos(self) -> None:
+        logger.debug("Iterando por bloco")
+        self.rastro.contexto(escopo=ESCOPO_BLOCO)
+        for grupo in self.grupos_bloco:
+            self.rastro.contexto(grupo=self.rotulo_bloco[grupo.linhas[0]])
+            self._processa_grupo(grupo, self.meta_bloco, self.ic_blo, self.eco_pot_blo, self.soma_bloco, recalcula_antes=True)
+
+    def processa_global(self) -> None:
+        """
+        Fase global. As somas são remontadas no início da fase, de forma que o resultado não depende da ordem em que
+        municípios e blocos foram processados (sequencialmente ou por componentes em paralelo)
+        """
+        logger.debug("Iteração global")
+        self.rastro.contexto(escopo=ESCOPO_GLOBAL, grupo=ESCOPO_GLOBAL)
+        self.reinicia_somas()
+        grupo = self.grupo_global
+        self.ic_glo[:] = self.recalcula_IC(grupo, self.soma_glo, self.eco_pot_glo)
+        antes = self.eco_fact_bac.copy()
+        self.atinge_meta(grupo, self.meta_global, self.ic_glo, self.eco_pot_glo, self.ic_bac_tot, self.ic_bac, self.eco_fact_bac)
+        self._escreve_eco_fact(grupo.linhas, antes, (self.soma_mun, self.soma_bloco, self.soma_glo))
+        self.ic_glo[:] = self.recalcula_IC(grupo, self.soma_glo, self.eco_pot_glo)
+
+    def atualiza_ICs_ano(self) -> None:
+        """
+        Recalcula ic_mun e ic_blo de todos os municípios e blocos após o atingimento de todas as metas do ano, a partir
+        das somas correntes
+        """
+        for soma, eco_pot_escopo, p_ic in [(self.soma_mun, self.eco_pot_mun, self.ic_mun),
+                                           (self.soma_bloco, self.eco_pot_blo, self.ic_blo)]:
+            primeiras = primeira_linha_por_grupo(soma.codigos, soma.n_grupos)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                valor = espalha_por_grupo(soma.codigos, soma.valores() / eco_pot_escopo[primeiras])
+            _atribui(p_ic, np.arange(self.n), valor)
+
+    def estado(self) -> dict:
+        """
+        Arrays das colunas alteradas pela simulação
+        """
+        return {ic_bac: self.ic_bac, eco_fact_bac: self.eco_fact_bac, ic_bac_tot: self.ic_bac_tot,
+                ic_mun: self.ic_mun, ic_blo: self.ic_blo, ic_glo: self.ic_glo}
+
+
+def componentes_independentes(df: pd.DataFrame) -> np.ndarray:
+    """
+    Componente de cada linha do 'df' no grafo que liga municípios, blocos e predecessoras: duas bacias ficam no mesmo
+    componente se compartilham município ou bloco, ou se uma é predecessora (direta ou indireta) da outra. As fases de
+    município e bloco de componentes diferentes não leem nem escrevem o estado uma da outra.
+
+    Linhas sem COD_MUN ou BLOCO colocam todas as linhas em um único componente
+    """
+    cod_mun, n_mun = codifica_grupos(df, [col_cod_mun])
+    bloco, _ = codifica_grupos(df, [col_bloco])
+    if (cod_mun < 0).any() or (bloco < 0).any():
+        return np.zeros(len(df), dtype=np.int64)
+
+    # Union-find sobre os nós município (0..n_mun-1) e bloco (n_mun..)
+    pais = np.arange(n_mun + bloco.max() + 1)
+
+    def raiz(no):
+        while pais[no] != no:
+            pais[no] = pais[pais[no]]
+            no = pais[no]
+        return no
+
+    def une(a, b):
+        raiz_a, raiz_b = raiz(a), raiz(b)
+        if raiz_a != raiz_b:
+            pais[max(raiz_a, raiz_b)] = min(raiz_a, raiz_b)
+
+    for mun, blo in set(zip(cod_mun.tolist(), (bloco + n_mun).tolist())):
+        une(mun, blo)
+
+    # Predecessoras ligam o município da bacia ao município da predecessora
+    mun_da_bacia = pd.Series(cod_mun, index=df[col_bacia].to_numpy())
+    mun_da_bacia = mun_da_bacia[~mun_da_bacia.index.duplicated()]
+    predec = df[col_bacia_predec].to_numpy()
+    com_predec = pd.notna(predec)
+    mun_predec = mun_da_bacia.reindex(predec[com_predec]).to_numpy()
+    for mun, outro in set(zip(cod_mun[com_predec].tolist(), mun_predec.tolist())):
+        if not np.isnan(outro):
+            une(mun, int(outro))
+
+    return np.array([raiz(no) for no in range(n_mun)], dtype=np.int64)[cod_mun]
+
+
+# Estado de cada processo da simulação por componentes: o DataFrame é recebido uma única vez na criação do processo
+_df_processo = None
+_threshold_tir_processo = None
+_compilado_processo = False
+
+
+def _inicializa_processo(df: pd.DataFrame, threshold_tir: float, compilado: bool) -> None:
+    global _df_processo, _threshold_tir_processo, _compilado_processo
+    _df_processo = df
+    _threshold_tir_processo = threshold_tir
+    _compilado_processo = compilado
+
+
+def _simula_componente(posicoes: np.ndarray, estado: dict, ano, rastro_ativo: bool) -> tuple[dict, dict]:
+    """
+    Fases de município e bloco de um componente, a partir do 'estado' das suas linhas. Retorna o estado final e as
+    colunas do rastro
+    """
+    rastro = RastroDecisoes(rastro_ativo)
+    rastro.contexto(ano=ano)
+    simulador = SimuladorAno(_df_processo.iloc[posicoes], _threshold_tir_processo, rastro, _compilado_processo)
+    simulador.carrega_estado(estado)
+    simulador.processa_municipios()
+    simulador.processa_blocos()
+    return simulador.estado(), rastro.colunas
+
+
+def _processa_componentes(simulador: SimuladorAno, executor: ProcessPoolExecutor, posicoes: np.ndarray, componentes: np.ndarray, ano) -> None:
+    """
+    Roda as fases de município e bloco de cada componente do ano em paralelo e junta o resultado no 'simulador'. O rastro
+    é remontado na ordem da execução sequencial (municípios e depois blocos, na ordem do menor RANK_GLOBAL)
+    """
+    linhas_por_componente = [np.flatnonzero(componentes == componente) for componente in np.unique(componentes)]
+    estado_ano = simulador.estado()
+    rastro = simulador.rastro
+    tarefas = [executor.submit(_simula_componente, posicoes[linhas], {coluna: valores[linhas] for coluna, valores in estado_ano.items()},
+                               ano, rastro.ativo)
+               for linhas in linhas_por_componente]
+
+    decisoes_por_grupo = {}
+    for linhas, tarefa in zip(linhas_por_componente, tarefas):
+        estado, colunas_rastro = tarefa.result()
+        for coluna, valores in estado.items():
+            estado_ano[coluna][linhas] = valores
+        for decisao in zip(*colunas_rastro.values()):
+            decisoes_por_grupo.setdefault((decisao[1], decisao[2]), []).append(decisao)
+
+    if rastro.ativo:
+        for escopo, grupos, rotulos in [(ESCOPO_MUNICIPIO, simulador.grupos_mun, simulador.rotulo_mun),
+                                        (ESCOPO_BLOCO, simulador.grupos_bloco, simulador.rotulo_bloco)]:
+            for grupo in grupos:
+                for decisao in decisoes_por_grupo.get((escopo, rotulos[grupo.linhas[0]]), []):
+                    rastro.anexa(decisao)
+
+
+def simula_por_ano(df: pd.DataFrame, ano_inicio_capex: int, threshold_tir: float, rastro: RastroDecisoes = None, n_processos: int = 1,
+                   retomada: tuple = None, compilado: bool = False) -> Iterator[tuple]:
+    """
+    Executa a simulação ano a ano a partir do ano_inicio_capex e entrega cada ano assim que ele termina, como
+    (ano, posicoes, estado): as posições das linhas do ano no 'df' e os arrays finais das colunas de COLUNAS_ESTADO.
+    Valores NaN calculados não sobrescrevem os originais, como no DataFrame.update da implementação pandas. Apenas o
+    estado do ano anterior é mantido entre os anos; o 'df' não é alterado.
+
+    As decisões são registradas no 'rastro', quando ativo. Com 'n_processos' > 1 e mais de um componente independente
+    (ver componentes_independentes), as fases de município e bloco de cada componente rodam em processos separados; o
+    resultado é idêntico ao da execução sequencial.
+
+    Cada ano e as suas fases (preparação, município, bloco e global) são cronometrados em objects/utils/metricas.
+
+    A 'retomada' (ano, estado) continua uma simulação interrompida: os anos até 'ano' são pulados e o 'estado' final
+    desse ano (como entregue por esta função) é o ponto de partida do ano seguinte.
+
+    Com 'compilado', o laço do atinge_meta roda no núcleo compilado pelo numba (nucleo.py); sem o numba instalado, a
+    simulação segue no NumPy, com o mesmo resultado
+    """
+    rastro = RastroDecisoes() if rastro is None else rastro
+    if compilado and not NUMBA_DISPONIVEL:
+        logger.warning("numba não instalado; o atinge_meta roda no NumPy (pip install priorizacao_capex[compilado])")
+        compilado = False
+    anos = df[col_ano].to_numpy()
+
+    componentes = componentes_independentes(df) if n_processos > 1 else np.zeros(len(df), dtype=np.int64)
+    n_componentes = len(np.unique(componentes))
+    executor = None
+    if n_componentes > 1:
+        logger.info("Simulando %d componentes independentes em até %d processos", n_componentes, n_processos)
+        executor = ProcessPoolExecutor(min(n_processos, n_componentes), initializer=_inicializa_processo, initargs=(df, threshold_tir, compilado))
+
+    try:
+        ultimo_ano, anterior = retomada if retomada is not None else (None, None)
+        for ano in sorted(pd.unique(anos[anos >= ano_inicio_capex])):
+            if ultimo_ano is not None and ano <= ultimo_ano:
+                continue
+            logger.info("Processando ano: %s", ano)
+            rastro.contexto(ano=ano)
+            with cronometra("ano", ano=int(ano)):
+                posicoes = np.flatnonzero(anos == ano)
+                df_ano = df.iloc[posicoes]
+                with cronometra("preparacao", ano=int(ano)):
+                    simulador = SimuladorAno(df_ano, threshold_tir, rastro, compilado)
+                    if anterior is not None:
+                        simulador.transfere_ano_anterior(anterior)
+
+                if executor is not None and len(np.unique(componentes[posicoes])) > 1:
+                    with cronometra("municipio_bloco", ano=int(ano)):
+                        _processa_componentes(simulador, executor, posicoes, componentes[posicoes], ano)
+                else:
+                    with cronometra("municipio", ano=int(ano)):
+                        simulador.processa_municipios()
+                    with cronometra("bloco", ano=int(ano)):
+                        simulador.processa_blocos()
+                with cronometra("global", ano=int(ano)):
+                    simulador.processa_global()
+                    simulador.atualiza_ICs_ano()
+
+                # Consolida o resultado do ano (valores NaN mantêm o original) e o usa como ponto de partida do próximo ano
+                for coluna, valores in simulador.estado().items():
+                    consolidado = df_ano[coluna].to_numpy(dtype=float, copy=True)
+                    _atribui(consolidado, np.arange(len(consolidado)), valores)
+                    valores[:] = consolidado
+                anterior = simulador.estado()
+
+            yield ano, posicoes, {coluna: valores.copy() for coluna, valores in anterior.items()}
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def simula_priorizacao(df: pd.DataFrame, ano_inicio_capex: int, threshold_tir: float, rastro: RastroDecisoes = None, n_processos: int = 1,
+                       compilado: bool = False) -> pd.DataFrame:
+    """
+    Executa a simulação completa (ver simula_por_ano) e devolve o 'df' com as colunas de COLUNAS_ESTADO atualizadas
+    """
+    return aplica_anos(df, simula_por_ano(df, ano_inicio_capex, threshold_tir, rastro, n_processos, compilado=compilado))
+
+
+def aplica_anos(df: pd.DataFrame, anos: Iterator[tuple]) -> pd.DataFrame:
+    """
+    Escreve no 'df' as colunas de COLUNAS_ESTADO de cada ano entregue por 'anos' (ver simula_por_ano)
+    """
+    colunas = {coluna: df[coluna].to_numpy(dtype=float, copy=True) for coluna in COLUNAS_ESTADO}
+    for _, posicoes, estado in anos:
+        for coluna, valores in estado.items():
+            colunas[coluna][posicoes] = valores
+
+    for coluna, valores in colunas.items():
+        df[coluna] = valores
+
+    return df
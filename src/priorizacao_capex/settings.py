@@ -8,6 +8,11 @@ https://docs.kedro.org/en/stable/kedro_project_setup/settings.html."""
 
 # Hooks are executed in a Last-In-First-Out (LIFO) order.
 # HOOKS = (ProjectHooks(),)
+from priorizacao_capex.hooks import MetricasHooks  # noqa: E402
+
+# Tempo, CPU e memória por nó, leituras e gravações por dataset e etapas do prioriza_bacias, em
+# data/06_metricas/metricas.jsonl. Com sqlite=True, também na tabela metricas do banco do SESSION_STORE_CLASS
+HOOKS = (MetricasHooks(arquivo="data/06_metricas/metricas.jsonl", sqlite=False),)
 
 # Installed plugins for which to disable hook auto-registration.
 # DISABLE_HOOKS_FOR_PLUGINS = ("kedro-viz",)
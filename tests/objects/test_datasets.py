@@ -0,0 +1,92 @@
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from kedro.io import DatasetError
+
+from priorizacao_capex.objects.datasets import ExcelEmCacheDataset, ParquetCompactoDataset, ParticionadoPorExecucaoDataset
+
+
+@pytest.fixture
+def planilha(tmp_path):
+    caminho = tmp_path / "input.xlsx"
+    pd.DataFrame({"BACIA": ["B1", "B2"], "ANO": [0, 1], "FLUXO": [-10.0, 3.5]}).to_excel(caminho, index=False)
+    return caminho
+
+
+class TestExcelEmCacheDataset:
+    @pytest.mark.parametrize("impressao_digital", ["mtime", "hash"])
+    def test_le_do_cache_ate_a_planilha_mudar(self, tmp_path, planilha, impressao_digital, monkeypatch):
+        cache = tmp_path / "cache" / "input.parquet"
+        dataset = ExcelEmCacheDataset(str(planilha), str(cache), impressao_digital=impressao_digital)
+
+        esperado = dataset.load()
+        assert cache.exists()
+
+        leituras = []
+        read_excel = pd.read_excel
+        monkeypatch.setattr(pd, "read_excel", lambda *args, **kwargs: leituras.append(args) or read_excel(*args, **kwargs))
+        pd.testing.assert_frame_equal(dataset.load(), esperado)
+        assert len(leituras) == 0
+
+        pd.DataFrame({"BACIA": ["B3"], "ANO": [2], "FLUXO": [1.0]}).to_excel(planilha, index=False)
+        estado = planilha.stat()
+        os.utime(planilha, ns=(estado.st_atime_ns, estado.st_mtime_ns + 10**9))
+        assert dataset.load()["BACIA"].tolist() == ["B3"]
+        assert len(leituras) == 1
+
+    def test_somente_leitura(self, planilha):
+        with pytest.raises(DatasetError):
+            ExcelEmCacheDataset(str(planilha)).save(pd.DataFrame())
+
+
+class TestParquetCompactoDataset:
+    @pytest.fixture
+    def df(self):
+        return pd.DataFrame({
+            "BACIA": ["B1", "B2", "B3"],
+            "COD_MUN": [1000, 1000, 1001],
+            "BACIA_PREDEC": [np.nan, "B1", "B1"],
+            "ANO": [2, 2, 2],
+            "RANK_MUN": [1.0, 2.0, np.nan],
+            "P_IC_BAC_TOT": [0.125, 0.5, 1.0],
+            "ECO_POT": [3e7, 1.5, 2.25],
+        })
+
+    @pytest.mark.parametrize("float32", [False, True])
+    def test_grava_com_tipos_compactos(self, tmp_path, df, float32, caplog):
+        dataset = ParquetCompactoDataset(str(tmp_path / "df.parquet"), float32=float32)
+        with caplog.at_level(logging.INFO, logger="priorizacao_capex.objects.datasets.parquet_compacto"):
+            dataset.save(df)
+        assert "Esquema compacto" in caplog.text
+
+        carregado = dataset.load()
+        assert carregado["BACIA"].dtype == "category"
+        assert carregado["BACIA_PREDEC"].dtype == "category"
+        assert carregado["COD_MUN"].dtype == "int32"
+        assert carregado["ANO"].dtype == "int32"
+        # Com nulos, o ranking não cabe em int32 e é mantido
+        assert carregado["RANK_MUN"].dtype == "float64"
+        assert carregado["P_IC_BAC_TOT"].dtype == ("float32" if float32 else "float64")
+        assert carregado["ECO_POT"].dtype == "float64"
+        pd.testing.assert_frame_equal(carregado.astype(df.dtypes.to_dict()), df)
+
+
+class TestParticionadoPorExecucaoDataset:
+    def test_guarda_so_as_particoes_da_execucao(self, tmp_path):
+        def dataset():
+            return ParticionadoPorExecucaoDataset(path=str(tmp_path / "por_ano"), dataset="pandas.CSVDataset", filename_suffix=".csv")
+
+        df = pd.DataFrame({"ANO": [2]})
+        anterior = dataset()
+        for particao in ["ANO_0002", "ANO_0003", "ANO_0004"]:
+            anterior.save({particao: df})
+        assert sorted(anterior.load()) == ["ANO_0002", "ANO_0003", "ANO_0004"]
+
+        # Uma nova execução, com menos anos, não deixa as partições da anterior
+        atual = dataset()
+        for particao in ["ANO_0002", "ANO_0003"]:
+            atual.save({particao: df})
+        assert sorted(atual.load()) == ["ANO_0002", "ANO_0003"]
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from priorizacao_capex.objects.utils.sintetico import gera_concessao
+from priorizacao_capex.pipelines.data_processing.nodes import calcula_ranking_bacias, pre_processa_input
+from priorizacao_capex.pipelines.model_priorization.nodes import prioriza_bacias
+
+
+def _profundidades(input):
+    predecessoras = input[input["ANO"] == 0].set_index("BACIA")["BACIA_PREDEC"].to_dict()
+
+    def profundidade(bacia):
+        return 0 if predecessoras[bacia] is None else 1 + profundidade(predecessoras[bacia])
+
+    return pd.Series({bacia: profundidade(bacia) for bacia in predecessoras})
+
+
+class TestGeraConcessao:
+    def test_esquema_do_input(self):
+        input, parametros = gera_concessao(n_bacias=50, n_municipios=6, n_blocos=2, n_anos=8)
+
+        assert input.columns.tolist() == ["COD_MUN", "BLOCO", "BACIA", "ANO", "FLUXO", "IC_E", "ECO_POT", "ECO_INCR_CONCED",
+                                          "META_MUN", "META_BLOCO", "META_GLOBAL", "BACIA_PREDEC", "EXEC_PREDEC"]
+        assert parametros.columns.tolist() == ["TAXA_DESCONTO", "ANO_INICIO_CAPEX", "THRESHOLD_TIR"]
+        assert len(input) == 50 * 8
+        assert input["COD_MUN"].nunique() == 6 and input["BLOCO"].nunique() == 2
+        assert input.groupby("COD_MUN")["BLOCO"].nunique().eq(1).all()
+
+    @pytest.mark.parametrize("profundidade_predec", [1, 3])
+    def test_profundidade_das_cadeias(self, profundidade_predec):
+        input, parametros = gera_concessao(n_bacias=300, n_municipios=10, n_blocos=3, n_anos=6, profundidade_predec=profundidade_predec, seed=3)
+
+        assert _profundidades(input).max() == profundidade_predec
+
+        # As cadeias com mais de um nível não levam o atinge_meta à repriorização indefinida
+        prioriza_bacias(pre_processa_input(input.copy(), calcula_ranking_bacias(input.copy(), parametros)), parametros)
+
+    @pytest.mark.parametrize("predecessoras_bloqueadas", [False, True])
+    def test_predecessoras_bloqueadas(self, predecessoras_bloqueadas):
+        input, parametros = gera_concessao(n_bacias=300, n_municipios=10, n_blocos=3, n_anos=6, profundidade_predec=3, seed=3,
+                                           predecessoras_bloqueadas=predecessoras_bloqueadas)
+
+        # Predecessoras de predecessoras que começam abaixo do EXEC_PREDEC (bloqueiam a sua dependente)
+        ano_0 = input[input["ANO"] == 0].set_index("BACIA")
+        predecessoras = ano_0.loc[ano_0["BACIA_PREDEC"].dropna().unique()]
+        predec_de_predec = ano_0.loc[predecessoras["BACIA_PREDEC"].dropna().unique()]
+        bloqueadas = (predec_de_predec["IC_E"] < predec_de_predec["EXEC_PREDEC"]).sum()
+        assert (bloqueadas > 0) == predecessoras_bloqueadas
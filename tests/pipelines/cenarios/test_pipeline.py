@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from priorizacao_capex.objects.utils.sintetico import gera_concessao
+from priorizacao_capex.pipelines.cenarios.nodes import monta_cenarios, varre_cenarios
+from priorizacao_capex.pipelines.data_processing.nodes import calcula_ranking_bacias, pre_processa_input
+from priorizacao_capex.pipelines.model_priorization.nodes import prioriza_bacias
+
+
+class TestVarreCenarios:
+    def test_monta_cenarios(self):
+        parametros = pd.DataFrame({"TAXA_DESCONTO": [0.1], "ANO_INICIO_CAPEX": [2], "THRESHOLD_TIR": [0.2]})
+        cenarios = monta_cenarios(parametros, {"TAXA_DESCONTO": [0.08, 0.12], "THRESHOLD_TIR": [0.1, 0.2, 0.3]})
+
+        assert cenarios.columns.tolist() == ["CENARIO", "TAXA_DESCONTO", "ANO_INICIO_CAPEX", "THRESHOLD_TIR"]
+        assert cenarios["CENARIO"].tolist() == list(range(1, 7))
+        assert set(cenarios["ANO_INICIO_CAPEX"]) == {2}
+
+    def test_igual_a_execucoes_individuais(self):
+        input, parametros = gera_concessao(n_bacias=20, n_municipios=4, n_blocos=2, n_anos=5, seed=0)
+        grade = {"TAXA_DESCONTO": [0.05, 0.1], "THRESHOLD_TIR": [0.1, 0.3], "n_processos": 2}
+
+        resultados = varre_cenarios(input.copy(), parametros, grade)
+
+        assert resultados["CENARIO"].nunique() == 4
+        for cenario, resultado in resultados.groupby("CENARIO"):
+            parametros_cenario = parametros.copy()
+            parametros_cenario[["TAXA_DESCONTO", "ANO_INICIO_CAPEX", "THRESHOLD_TIR"]] = \
+                resultado[["TAXA_DESCONTO", "ANO_INICIO_CAPEX", "THRESHOLD_TIR"]].iloc[[0]].to_numpy()
+            ranking_bacias = calcula_ranking_bacias(input.copy(), parametros_cenario)
+            _, esperado, _ = prioriza_bacias(pre_processa_input(input.copy(), ranking_bacias), parametros_cenario)
+
+            pd.testing.assert_frame_equal(resultado[esperado.columns].reset_index(drop=True), esperado.reset_index(drop=True))
+
+    def test_motor_da_simulacao(self):
+        input, parametros = gera_concessao(n_bacias=20, n_municipios=4, n_blocos=2, n_anos=5, seed=1)
+        grade = {"TAXA_DESCONTO": [0.05, 0.1], "THRESHOLD_TIR": [0.1, 0.3], "n_processos": 2}
+
+        esperados = varre_cenarios(input.copy(), parametros, grade, simulacao={"motor": "arrays"})
+        obtidos = varre_cenarios(input.copy(), parametros, grade, simulacao={"motor": "referencia"})
+
+        pd.testing.assert_frame_equal(obtidos, esperados, check_exact=True)
+
+        # O params:simulacao chega à simulação de cada cenário
+        with pytest.raises(ValueError, match="Motor de simulação 'numpy' desconhecido"):
+            varre_cenarios(input.copy(), parametros, grade, simulacao={"motor": "numpy"})
@@ -7,3 +7,185 @@ Kedro recommends using `pytest` framework, more info about it can be found
 in the official documentation:
 https://docs.pytest.org/en/latest/getting-started.html
 """
+import numpy as np
+import numpy_financial as npf
+import pandas as pd
+import pytest
+
+from priorizacao_capex.objects.utils.sintetico import gera_concessao
+from priorizacao_capex.pipelines.data_processing import nodes
+from priorizacao_capex.pipelines.data_processing.nodes import (
+    calcula_ranking_bacias,
+    calculate_tir_vpl,
+    construir_ordem_fisica,
+    pre_processa_input,
+    ranking_economico,
+)
+
+
+def _tir_referencia(fluxos):
+    tir = npf.irr(fluxos)
+    return 0 if np.isnan(tir) else tir
+
+
+class TestCalculateTirVpl:
+    def test_equivalente_ao_numpy_financial(self):
+        rng = np.random.default_rng(42)
+        n_bacias, n_anos = 300, 30
+        fluxos = np.c_[-rng.uniform(10, 500, (n_bacias, 1)), rng.uniform(-5, 40, (n_bacias, n_anos - 1))]
+        fluxos[::7, 3:6] = 0  # fluxos zerados no meio
+        fluxos[::11, -4:] = 0  # fluxos zerados no final
+        fluxos[::17, 0] = 5  # fluxo não convencional
+        fluxos[::13] = -np.abs(fluxos[::13])  # sem TIR, deve retornar 0
+
+        input = pd.DataFrame({
+            "COD_MUN": np.repeat(np.arange(n_bacias) % 10, n_anos),
+            "BLOCO": np.repeat([f"BL{i % 3}" for i in range(n_bacias)], n_anos),
+            "BACIA": np.repeat([f"B{i:04d}" for i in range(n_bacias)], n_anos),
+            "FLUXO": fluxos.ravel(),
+        })
+
+        df_VPL_TIR = calculate_tir_vpl(input, 0.1).set_index("BACIA")
+
+        for i in range(n_bacias):
+            linha = df_VPL_TIR.loc[f"B{i:04d}"]
+            assert np.isclose(linha["VPL"], npf.npv(0.1, fluxos[i]), rtol=1e-12, atol=1e-9)
+            assert np.isclose(linha["TIR"], _tir_referencia(fluxos[i]), rtol=1e-10, atol=1e-12)
+        assert (df_VPL_TIR.loc[[f"B{i:04d}" for i in range(0, n_bacias, 13)], "TIR"] == 0).all()
+
+
+class TestConstruirOrdemFisica:
+    def test_predecessoras_antes_das_dependentes(self):
+        bacias = pd.Series(["A", "B", "C", "D", "E"])
+        predecessoras = pd.Series([None, "D", "A", None, "C"])
+        assert construir_ordem_fisica(bacias, predecessoras) == ["A", "D", "B", "C", "E"]
+
+    def test_ciclo_gera_erro(self):
+        with pytest.raises(ValueError, match="Ciclo"):
+            construir_ordem_fisica(pd.Series(["A", "B", "C"]), pd.Series([None, "C", "B"]))
+
+    def test_predecessora_inexistente_gera_erro(self):
+        with pytest.raises(ValueError, match="não encontradas"):
+            construir_ordem_fisica(pd.Series(["A", "B"]), pd.Series([None, "X"]))
+
+
+def _ranking_economico_tuplas(df_VPL_TIR, taxa_desconto):
+    # Implementação original, com uma tupla de ordenação por linha
+    df_VPL_TIR["RANK_VPL"] = df_VPL_TIR["VPL"].rank(ascending=False, method="first").astype(int)
+    df_VPL_TIR["RANK_TIR"] = df_VPL_TIR["TIR"].rank(ascending=False, method="first").astype(int)
+
+    def chave_ordenacao(row):
+        if row["TIR"] >= taxa_desconto:
+            return (-row["TIR"], -row["VPL"])
+        return (0, -row["VPL"])
+
+    df_VPL_TIR["chave_ordenacao"] = df_VPL_TIR.apply(chave_ordenacao, axis=1)
+    df = df_VPL_TIR.sort_values(by="chave_ordenacao").reset_index(drop=True)
+    df["RANK_ECONOMICO"] = df.index + 1
+    return df.drop(columns="chave_ordenacao")
+
+
+class TestRankingEconomico:
+    def test_paridade_com_chave_de_tuplas(self):
+        rng = np.random.default_rng(7)
+        n_bacias = 100_000
+        df_VPL_TIR = pd.DataFrame({
+            "BACIA": [f"B{i:06d}" for i in range(n_bacias)],
+            "VPL": rng.normal(0, 1000, n_bacias),
+            "TIR": np.where(rng.random(n_bacias) < 0.2, 0, rng.uniform(-0.1, 0.5, n_bacias)),
+        })
+
+        esperado = _ranking_economico_tuplas(df_VPL_TIR.copy(), 0.1)
+        obtido = ranking_economico(df_VPL_TIR.copy(), 0.1)
+
+        pd.testing.assert_frame_equal(obtido, esperado)
+
+    def test_empates_mantem_ordem_original(self):
+        df_VPL_TIR = pd.DataFrame({
+            "BACIA": ["A", "B", "C", "D", "E"],
+            "VPL": [10.0, 50.0, 10.0, 5.0, 50.0],
+            "TIR": [0.05, 0.3, 0.0, 0.3, 0.08],
+        })
+
+        obtido = ranking_economico(df_VPL_TIR, 0.1)
+
+        assert obtido["BACIA"].tolist() == ["B", "D", "E", "A", "C"]
+        assert obtido["RANK_ECONOMICO"].tolist() == [1, 2, 3, 4, 5]
+
+
+class TestCalculaRankingBacias:
+    def test_cache_por_conteudo(self, tmp_path, monkeypatch):
+        rng = np.random.default_rng(0)
+        input = pd.DataFrame({
+            "COD_MUN": np.repeat([1, 1, 2, 2], 4),
+            "BLOCO": np.repeat(["BL0", "BL0", "BL1", "BL1"], 4),
+            "BACIA": np.repeat(["B0", "B1", "B2", "B3"], 4),
+            "ANO": np.tile(np.arange(4), 4),
+            "FLUXO": np.where(np.tile(np.arange(4), 4) == 0, -100.0, rng.uniform(10, 60, 16)),
+            "BACIA_PREDEC": np.repeat([None, "B0", None, None], 4),
+        })
+        for coluna in ["IC_E", "ECO_POT", "ECO_INCR_CONCED", "META_MUN", "META_BLOCO", "META_GLOBAL"]:
+            input[coluna] = 0.5
+        parametros = pd.DataFrame({"TAXA_DESCONTO": [0.1]})
+        cache = {"diretorio": str(tmp_path)}
+
+        calculos = []
+        calculate_tir_vpl_original = nodes.calculate_tir_vpl
+        monkeypatch.setattr(nodes, "calculate_tir_vpl", lambda *args: calculos.append(args) or calculate_tir_vpl_original(*args))
+
+        esperado = calcula_ranking_bacias(input.copy(), parametros, cache)
+        pd.testing.assert_frame_equal(calcula_ranking_bacias(input.copy(), parametros, cache), esperado)
+        assert len(calculos) == 1
+
+        # Outra taxa de desconto ou outro fluxo geram uma nova chave
+        calcula_ranking_bacias(input.copy(), pd.DataFrame({"TAXA_DESCONTO": [0.2]}), cache)
+        input.loc[5, "FLUXO"] += 1
+        calcula_ranking_bacias(input.copy(), parametros, cache)
+        assert len(calculos) == 3
+
+        # Uma nova versão do cálculo do ranking também
+        monkeypatch.setattr(nodes, "VERSAO_RANKING", nodes.VERSAO_RANKING + 1)
+        calcula_ranking_bacias(input.copy(), parametros, cache)
+        assert len(calculos) == 4
+
+
+def _pre_processa_input_merges(input, ranking_bacias):
+    # Implementação original, com um groupby e um merge por soma
+    def cria_col_soma(df, groupby_cols, agg_col, new_col_name):
+        aggregated = df.groupby(groupby_cols).agg({agg_col: "sum"}).rename(columns={agg_col: new_col_name})
+        return pd.merge(df, aggregated, on=groupby_cols, how="left")
+
+    df = pd.merge(input, ranking_bacias[["BACIA", "TIR", "RANK_ECONOMICO", "RANK_GLOBAL", "RANK_BLOCO", "RANK_MUN"]], on="BACIA", how="left")
+    df_filtered = df[df["ANO"] == 0][["BACIA", "IC_E"]].drop_duplicates().rename(columns={"IC_E": "IC_BAC_APOIO"})
+    df = pd.merge(df, df_filtered, on="BACIA", how="left")
+    df = cria_col_soma(df, ["COD_MUN", "ANO"], "ECO_POT", "ECO_POT_MUN")
+    df = cria_col_soma(df, ["BLOCO", "ANO"], "ECO_POT", "ECO_POT_BLOCO")
+    df = cria_col_soma(df, ["ANO"], "ECO_POT", "ECO_POT_GLOBAL")
+    df["P_ECO_FACT_BAC"] = (df["ECO_POT"] * df["IC_BAC_APOIO"]) + df["ECO_INCR_CONCED"]
+    for chaves, coluna_eco_pot, coluna_ic in [(["COD_MUN", "ANO"], "ECO_POT_MUN", "P_IC_MUN"),
+                                               (["BLOCO", "ANO"], "ECO_POT_BLOCO", "P_IC_BLO"),
+                                               (["ANO"], "ECO_POT_GLOBAL", "P_IC_GLO")]:
+        df = cria_col_soma(df, chaves, "P_ECO_FACT_BAC", "SOMA_P_ECO_FACT_BAC")
+        df[coluna_ic] = df["SOMA_P_ECO_FACT_BAC"] / df[coluna_eco_pot]
+        df.drop(columns="SOMA_P_ECO_FACT_BAC", inplace=True)
+    df["P_IC_BAC"] = df["IC_BAC_APOIO"].copy()
+    df["P_IC_BAC_TOT"] = np.where(df["ECO_POT"] != 0, df["P_ECO_FACT_BAC"] / df["ECO_POT"], 0)
+    return df.drop(columns="FLUXO")
+
+
+class TestPreProcessaInput:
+    @pytest.mark.parametrize("seed", [0, 1])
+    def test_paridade_com_merges(self, seed):
+        input, parametros = gera_concessao(n_bacias=200, n_municipios=12, n_blocos=4, n_anos=8, seed=seed)
+        ranking_bacias = calcula_ranking_bacias(input.copy(), parametros)
+
+        # Chaves e economias nulas em algumas linhas
+        rng = np.random.default_rng(seed)
+        input.loc[rng.choice(len(input), 40, replace=False), "COD_MUN"] = np.nan
+        input.loc[rng.choice(len(input), 40, replace=False), "BLOCO"] = None
+        input.loc[rng.choice(len(input), 40, replace=False), "ECO_POT"] = np.nan
+
+        esperado = _pre_processa_input_merges(input.copy(), ranking_bacias)
+        obtido = pre_processa_input(input.copy(), ranking_bacias)
+
+        pd.testing.assert_frame_equal(obtido, esperado, check_exact=True)
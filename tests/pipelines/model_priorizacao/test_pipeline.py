@@ -7,3 +7,306 @@ Kedro recommends using `pytest` framework, more info about it can be found
 in the official documentation:
 https://docs.pytest.org/en/latest/getting-started.html
 """
+import itertools
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+from kedro_datasets.partitions import PartitionedDataset
+
+from priorizacao_capex.objects.utils.esquema import compacta
+from priorizacao_capex.objects.utils.sintetico import gera_concessao
+from priorizacao_capex.pipelines.data_processing.nodes import calcula_ranking_bacias, pre_processa_input
+from priorizacao_capex.pipelines.model_priorization.nodes import (
+    MOTORES_SIMULACAO,
+    prioriza_bacias,
+    prioriza_bacias_por_ano,
+    round_cols,
+    simula_priorizacao_referencia,
+)
+from priorizacao_capex.pipelines.model_priorization import checkpoint, nucleo, simulador
+from priorizacao_capex.pipelines.model_priorization.checkpoint import simula_com_checkpoint
+from priorizacao_capex.pipelines.model_priorization.rastro import RastroDecisoes
+from priorizacao_capex.pipelines.model_priorization.simulador import SomaCorrente, componentes_independentes, simula_priorizacao
+
+
+@pytest.fixture(params=[0, 1])
+def input_pre_processado(request):
+    input, parametros = gera_concessao(n_bacias=30, n_municipios=5, n_blocos=2, n_anos=5, seed=request.param)
+    ranking_bacias = calcula_ranking_bacias(input.copy(), parametros)
+    return pre_processa_input(input, ranking_bacias), parametros
+
+
+class TestPriorizaBacias:
+    def test_motor_em_arrays_igual_a_referencia(self, input_pre_processado):
+        df, parametros = input_pre_processado
+
+        esperado = round_cols(simula_priorizacao_referencia(df.copy(), 2, 0.2))
+        obtido, df_report, rastro = prioriza_bacias(df.copy(), parametros)
+
+        pd.testing.assert_frame_equal(obtido, esperado, check_exact=True)
+        assert df_report.columns.tolist() == ["BACIA", "ANO", "P_IC_BAC_TOT"]
+        assert rastro.empty
+
+    @pytest.mark.parametrize("motor", list(MOTORES_SIMULACAO))
+    def test_input_compacto(self, input_pre_processado, motor):
+        df, parametros = input_pre_processado
+
+        # Bloco sem bacias entre as categorias, como em um input compacto filtrado: os agrupamentos consideram só os
+        # blocos presentes
+        compacto = compacta(df)
+        compacto["BLOCO"] = compacto["BLOCO"].cat.add_categories(["BL_SEM_BACIAS"])
+
+        esperados = prioriza_bacias(df.copy(), parametros, {"motor": motor})
+        obtidos = prioriza_bacias(compacto, parametros, {"motor": motor})
+
+        for obtido, esperado in zip(obtidos, esperados):
+            pd.testing.assert_frame_equal(obtido.astype(esperado.dtypes.to_dict()), esperado, check_exact=True)
+
+    def test_rastro_igual_a_referencia(self, input_pre_processado):
+        df, _ = input_pre_processado
+
+        rastro_referencia, rastro_motor = RastroDecisoes(ativo=True), RastroDecisoes(ativo=True)
+        simula_priorizacao_referencia(df.copy(), 2, 0.2, rastro_referencia)
+        simula_priorizacao(df.copy(), 2, 0.2, rastro_motor)
+
+        esperado = rastro_referencia.para_dataframe()
+        assert not esperado.empty
+        assert esperado.columns.tolist() == ["ANO", "ESCOPO", "GRUPO", "EVENTO", "BACIA"]
+        pd.testing.assert_frame_equal(rastro_motor.para_dataframe(), esperado)
+
+    def test_por_ano_igual_ao_completo(self, input_pre_processado, tmp_path, caplog):
+        df, parametros = input_pre_processado
+        caplog.set_level(logging.DEBUG, logger="priorizacao_capex.rastro")
+
+        esperados = prioriza_bacias(df.copy(), parametros)
+        datasets = [PartitionedDataset(path=str(tmp_path / nome), dataset="pandas.ParquetDataset", filename_suffix=".parquet")
+                    for nome in ["bacias_priorizadas", "dataset_resumo", "rastro_decisoes"]]
+        for particoes in prioriza_bacias_por_ano(df.copy(), parametros):
+            for dataset, particao in zip(datasets, particoes):
+                dataset.save(particao)
+
+        obtidos = []
+        for dataset in datasets:
+            particoes = dataset.load()
+            assert list(particoes) == [f"ANO_{ano:04d}" for ano in range(5)]
+            obtidos.append(pd.concat([particao for particao in (carrega() for carrega in particoes.values()) if not particao.empty]))
+
+        # As bacias seguem a ordem do input dentro de cada ano; o rastro, a ordem das decisões
+        bacias_priorizadas, dataset_resumo, rastro_decisoes = obtidos
+        pd.testing.assert_frame_equal(bacias_priorizadas.sort_index(), esperados[0], check_exact=True)
+        pd.testing.assert_frame_equal(dataset_resumo.sort_index(), esperados[1], check_exact=True)
+        pd.testing.assert_frame_equal(rastro_decisoes.reset_index(drop=True), esperados[2])
+
+
+class TestComponentesIndependentes:
+    def _concessoes_independentes(self, n_concessoes):
+        # Concessões sintéticas sem predecessoras entre si, cada uma em um bloco próprio
+        partes = []
+        for k in range(n_concessoes):
+            input, parametros = gera_concessao(n_bacias=20, n_municipios=3, n_blocos=1, n_anos=5, seed=10 + k)
+            input["BACIA"] = f"K{k}_" + input["BACIA"]
+            input["BACIA_PREDEC"] = input["BACIA_PREDEC"].map(lambda bacia: f"K{k}_{bacia}" if bacia else None)
+            input["COD_MUN"] += 100 * k
+            input["BLOCO"] = f"BL{k}"
+            partes.append(input)
+        input = pd.concat(partes, ignore_index=True)
+        return pre_processa_input(input, calcula_ranking_bacias(input.copy(), parametros))
+
+    def test_componentes(self):
+        df = self._concessoes_independentes(3)
+        componentes = componentes_independentes(df)
+
+        assert len(np.unique(componentes)) == 3
+        assert pd.Series(componentes).groupby(df["BLOCO"].to_numpy()).nunique().eq(1).all()
+
+        # Uma predecessora entre blocos junta os componentes
+        df.loc[df["BACIA"] == "K1_B0005", "BACIA_PREDEC"] = "K0_B0001"
+        assert len(np.unique(componentes_independentes(df))) == 2
+
+    @pytest.mark.parametrize("compilado", [False, True])
+    def test_paralelo_igual_ao_sequencial(self, monkeypatch, compilado):
+        monkeypatch.setattr(simulador, "NUMBA_DISPONIVEL", True)
+        df = self._concessoes_independentes(3)
+
+        rastro_sequencial, rastro_paralelo = RastroDecisoes(ativo=True), RastroDecisoes(ativo=True)
+        esperado = simula_priorizacao(df.copy(), 2, 0.2, rastro_sequencial)
+        obtido = simula_priorizacao(df.copy(), 2, 0.2, rastro_paralelo, n_processos=3, compilado=compilado)
+
+        pd.testing.assert_frame_equal(obtido, esperado, check_exact=True)
+        pd.testing.assert_frame_equal(rastro_paralelo.para_dataframe(), rastro_sequencial.para_dataframe())
+
+
+@pytest.fixture
+def anos_simulados(monkeypatch):
+    """
+    Anos efetivamente simulados (não lidos do checkpoint) pelo simula_com_checkpoint, com qualquer motor
+    """
+    anos = []
+
+    def registrando(motor):
+        def motor_registrando(*args):
+            for ano, posicoes, estado in motor(*args):
+                anos.append(ano)
+                yield ano, posicoes, estado
+        return motor_registrando
+
+    monkeypatch.setattr(checkpoint, "simula_por_ano", registrando(checkpoint.simula_por_ano))
+    for nome, motor in list(MOTORES_SIMULACAO.items()):
+        monkeypatch.setitem(MOTORES_SIMULACAO, nome, registrando(motor))
+    return anos
+
+
+class TestCheckpoint:
+    def test_retomada_igual_a_execucao_sem_interrupcao(self, input_pre_processado, tmp_path, caplog, anos_simulados):
+        df, parametros = input_pre_processado
+        caplog.set_level(logging.DEBUG, logger="priorizacao_capex.rastro")
+        simulacao = {"checkpoint": {"diretorio": str(tmp_path), "retomar": True}}
+        esperados = prioriza_bacias(df.copy(), parametros)
+
+        # Execução interrompida após os dois primeiros anos simulados
+        anos = simula_com_checkpoint(df.copy(), 2, 0.2, RastroDecisoes(), 1, str(tmp_path))
+        assert [ano for ano, _, _ in itertools.islice(anos, 2)] == [2, 3]
+        anos.close()
+
+        anos_simulados.clear()
+        obtidos = prioriza_bacias(df.copy(), parametros, simulacao)
+
+        assert anos_simulados == [4]
+        for obtido, esperado in zip(obtidos, esperados):
+            pd.testing.assert_frame_equal(obtido, esperado, check_exact=True)
+
+        # Parâmetros diferentes: nenhum ano é reaproveitado
+        anos_simulados.clear()
+        prioriza_bacias(df.copy(), parametros.assign(THRESHOLD_TIR=0.3), simulacao)
+        assert anos_simulados == [2, 3, 4]
+
+    @pytest.mark.parametrize("ano_alterado, anos_esperados", [(3, [3, 4]), (4, [4])])
+    def test_repriorizacao_incremental(self, input_pre_processado, tmp_path, anos_simulados, ano_alterado, anos_esperados):
+        df, parametros = input_pre_processado
+        simulacao = {"checkpoint": {"diretorio": str(tmp_path), "retomar": True}}
+        prioriza_bacias(df.copy(), parametros, simulacao)
+        anos_simulados.clear()
+
+        alterado = df["ANO"] == ano_alterado
+        df.loc[alterado, "ECO_POT"] *= 1.2
+        df.loc[alterado, "META_GLOBAL"] += 0.02
+
+        obtidos = prioriza_bacias(df.copy(), parametros, simulacao)
+        assert anos_simulados == anos_esperados
+
+        esperados = prioriza_bacias(df.copy(), parametros)
+        for obtido, esperado in zip(obtidos, esperados):
+            pd.testing.assert_frame_equal(obtido, esperado, check_exact=True)
+
+    def test_retomada_com_rastro_ligado(self, input_pre_processado, tmp_path, caplog, anos_simulados):
+        df, parametros = input_pre_processado
+        simulacao = {"checkpoint": {"diretorio": str(tmp_path), "retomar": True}}
+
+        # Checkpoint gravado com o rastro desligado: o rastro de cada ano está vazio
+        prioriza_bacias(df.copy(), parametros, simulacao)
+        anos_simulados.clear()
+
+        caplog.set_level(logging.DEBUG, logger="priorizacao_capex.rastro")
+        obtidos = prioriza_bacias(df.copy(), parametros, simulacao)
+        assert anos_simulados == [2, 3, 4]
+
+        esperados = prioriza_bacias(df.copy(), parametros)
+        assert len(esperados[2]) > 0
+        for obtido, esperado in zip(obtidos, esperados):
+            pd.testing.assert_frame_equal(obtido, esperado, check_exact=True)
+
+
+class TestMotores:
+    def test_motor_referencia_igual_ao_arrays(self, input_pre_processado, caplog):
+        df, parametros = input_pre_processado
+        caplog.set_level(logging.DEBUG, logger="priorizacao_capex.rastro")
+
+        esperados = prioriza_bacias(df.copy(), parametros, {"motor": "arrays"})
+        obtidos = prioriza_bacias(df.copy(), parametros, {"motor": "referencia"})
+
+        assert len(esperados[2]) > 0
+        for obtido, esperado in zip(obtidos, esperados):
+            pd.testing.assert_frame_equal(obtido, esperado, check_exact=True)
+
+    def test_motor_desconhecido(self, input_pre_processado):
+        df, parametros = input_pre_processado
+
+        with pytest.raises(ValueError, match="Motor de simulação 'numpy' desconhecido"):
+            prioriza_bacias(df.copy(), parametros, {"motor": "numpy"})
+
+    def test_retomada_com_motor_referencia(self, input_pre_processado, tmp_path, anos_simulados):
+        df, parametros = input_pre_processado
+        esperados = prioriza_bacias(df.copy(), parametros)
+
+        # O checkpoint de um motor não é reaproveitado pelo outro
+        prioriza_bacias(df.copy(), parametros, {"checkpoint": {"diretorio": str(tmp_path)}})
+        anos = simula_com_checkpoint(df.copy(), 2, 0.2, RastroDecisoes(), 1, str(tmp_path), motor=MOTORES_SIMULACAO["referencia"],
+                                     nome_motor="referencia")
+        assert [ano for ano, _, _ in itertools.islice(anos, 1)] == [2]
+        anos.close()
+
+        anos_simulados.clear()
+        simulacao = {"motor": "referencia", "checkpoint": {"diretorio": str(tmp_path), "retomar": True}}
+        obtidos = prioriza_bacias(df.copy(), parametros, simulacao)
+
+        assert anos_simulados == [3, 4]
+        for obtido, esperado in zip(obtidos, esperados):
+            pd.testing.assert_frame_equal(obtido, esperado, check_exact=True)
+
+
+class TestNucleo:
+    @pytest.mark.parametrize("interpretado", [False, True])
+    @pytest.mark.parametrize("seed, profundidade_predec", [(0, 1), (1, 2), (2, 4)])
+    def test_nucleo_igual_ao_numpy(self, monkeypatch, seed, profundidade_predec, interpretado):
+        # O motor compilado usa o núcleo mesmo sem o numba, em Python puro. Com 'interpretado', o núcleo e as suas
+        # funções auxiliares rodam em Python puro também com o numba instalado (py_func da versão compilada)
+        monkeypatch.setattr(simulador, "NUMBA_DISPONIVEL", True)
+        if interpretado:
+            for nome in ["_anota", "_busca", "_habilitada"]:
+                monkeypatch.setattr(nucleo, nome, getattr(getattr(nucleo, nome), "py_func", getattr(nucleo, nome)))
+            monkeypatch.setattr(simulador, "atinge_meta_nucleo", getattr(nucleo.atinge_meta_nucleo, "py_func", nucleo.atinge_meta_nucleo))
+        elif not nucleo.NUMBA_DISPONIVEL:
+            pytest.skip("numba não instalado")
+        input, parametros = gera_concessao(n_bacias=80, n_municipios=8, n_blocos=3, n_anos=6,
+                                           profundidade_predec=profundidade_predec, seed=seed)
+        df = pre_processa_input(input.copy(), calcula_ranking_bacias(input.copy(), parametros))
+
+        rastro_numpy, rastro_nucleo = RastroDecisoes(ativo=True), RastroDecisoes(ativo=True)
+        esperado = simula_priorizacao(df.copy(), 2, 0.2, rastro_numpy)
+        obtido = simula_priorizacao(df.copy(), 2, 0.2, rastro_nucleo, compilado=True)
+
+        assert len(rastro_numpy) > 0
+        pd.testing.assert_frame_equal(obtido, esperado, check_exact=True)
+        pd.testing.assert_frame_equal(rastro_nucleo.para_dataframe(), rastro_numpy.para_dataframe())
+
+    def test_motor_compilado_sem_numba(self, input_pre_processado, monkeypatch, caplog):
+        monkeypatch.setattr(simulador, "NUMBA_DISPONIVEL", False)
+        df, parametros = input_pre_processado
+
+        obtidos = prioriza_bacias(df.copy(), parametros, {"motor": "compilado"})
+        esperados = prioriza_bacias(df.copy(), parametros)
+
+        assert "numba não instalado" in caplog.text
+        for obtido, esperado in zip(obtidos, esperados):
+            pd.testing.assert_frame_equal(obtido, esperado, check_exact=True)
+
+
+class TestSomaCorrente:
+    def test_somas_acompanham_os_deltas(self):
+        rng = np.random.default_rng(0)
+        codigos = rng.integers(-1, 4, 200)
+        eco_fact = rng.uniform(0, 1000, 200)
+        eco_fact[::17] = np.nan
+        soma = SomaCorrente(codigos, 4, eco_fact)
+
+        for _ in range(50):
+            linhas = rng.choice(200, 10, replace=False)
+            antes = eco_fact[linhas].copy()
+            eco_fact[linhas] = np.where(rng.random(10) < 0.1, np.nan, rng.uniform(0, 1000, 10))
+            soma.aplica(linhas, antes, eco_fact[linhas])
+
+        esperado = [np.nansum(eco_fact[codigos == codigo]) for codigo in range(4)]
+        np.testing.assert_allclose(soma.valores(), esperado, rtol=1e-14)
+        assert soma.valor(2) == soma.valores()[2]
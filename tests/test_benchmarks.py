@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from benchmarks.executa import compara, main
+
+
+def _resultado(tempo_s, pico_memoria_mb, parametros=None):
+    return {
+        "cenario": "pequeno",
+        "parametros": parametros or {"n_bacias": 300, "seed": 0},
+        "nos": {"prioriza_bacias": {"tempo_s": tempo_s, "pico_memoria_mb": pico_memoria_mb}},
+    }
+
+
+class TestCompara:
+    def test_regressoes_acima_da_tolerancia(self):
+        baseline = _resultado(1.0, 100.0)
+
+        assert compara(_resultado(1.2, 105.0), baseline) == []
+        regressoes = compara(_resultado(1.5, 120.0), baseline)
+        assert len(regressoes) == 2
+        assert regressoes[0].startswith("pequeno/prioriza_bacias: tempo")
+
+    def test_diferenca_de_tempo_dentro_da_folga(self):
+        assert compara(_resultado(0.015, 1.0), _resultado(0.005, 1.0)) == []
+
+    def test_baseline_com_outros_parametros(self):
+        with pytest.raises(ValueError, match="outros parâmetros"):
+            compara(_resultado(1.0, 1.0), _resultado(1.0, 1.0, {"n_bacias": 10, "seed": 0}))
+
+
+class TestMain:
+    def test_grava_baseline_e_sinaliza_regressao(self, tmp_path, monkeypatch):
+        argumentos = ["--cenarios", "pequeno", "--repeticoes", "1", "--baselines", str(tmp_path / "baselines"), "--resultados", str(tmp_path / "resultados")]
+        assert main(argumentos + ["--grava-baseline"]) == 0
+
+        baseline = tmp_path / "baselines" / "pequeno.json"
+        conteudo = json.loads(baseline.read_text(encoding="utf-8"))
+        assert set(conteudo["nos"]) == {"calcula_ranking_bacias", "pre_processa_input", "prioriza_bacias"}
+        assert conteudo["linhas"] == 3000
+
+        # Uma baseline muito mais rápida transforma a execução atual em regressão
+        for medidas in conteudo["nos"].values():
+            medidas["tempo_s"] /= 100
+        baseline.write_text(json.dumps(conteudo), encoding="utf-8")
+        assert main(argumentos) == 1
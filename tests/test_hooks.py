@@ -0,0 +1,117 @@
+import json
+import sqlite3
+
+import numpy as np
+import pytest
+from kedro.framework.hooks import _create_hook_manager
+from kedro.io import DataCatalog, MemoryDataset
+from kedro.pipeline import node, pipeline
+from kedro.runner import SequentialRunner
+
+from priorizacao_capex import hooks as hooks_metricas
+from priorizacao_capex.hooks import MetricasHooks
+from priorizacao_capex.objects.utils.sintetico import gera_concessao
+from priorizacao_capex.pipelines.data_processing.pipeline import create_pipeline as create_pipeline_data_processing
+from priorizacao_capex.pipelines.model_priorization.pipeline import create_pipeline as create_pipeline_model_priorization
+from priorizacao_capex.pipelines.model_priorization.pipeline import create_pipeline_por_ano
+
+
+@pytest.fixture
+def executa(tmp_path, monkeypatch):
+    """
+    Roda data_processing + model_priorization (ou a 'simulacao' dada) sobre uma concessão sintética com os hooks de
+    métricas e devolve as métricas gravadas no arquivo
+    """
+    def executa(simulacao=create_pipeline_model_priorization, **kwargs):
+        input, parametros = gera_concessao(n_bacias=40, n_municipios=5, n_blocos=2, n_anos=4)
+        catalogo = DataCatalog({"input": MemoryDataset(input), "parametros": MemoryDataset(parametros),
+                                "params:cache_ranking_bacias": MemoryDataset({}), "params:simulacao": MemoryDataset({})})
+        hooks = MetricasHooks(arquivo=str(tmp_path / "metricas.jsonl"), **kwargs)
+        hook_manager = _create_hook_manager()
+        hook_manager.register(hooks)
+
+        hooks.before_pipeline_run({"session_id": "sessao_teste", "pipeline_name": None})
+        SequentialRunner().run(create_pipeline_data_processing() + simulacao(), catalogo, hook_manager)
+        hooks.after_pipeline_run()
+
+        linhas = (tmp_path / "metricas.jsonl").read_text(encoding="utf-8").splitlines()
+        return [json.loads(linha) for linha in linhas]
+
+    return executa
+
+
+class TestMetricasHooks:
+    def test_metricas_por_no_dataset_e_etapa(self, executa):
+        metricas = executa()
+
+        nos = {medida["nome"]: medida for medida in metricas if medida["tipo"] == "no"}
+        assert set(nos) == {"calcula_ranking_bacias_node", "pre_processa_input_node", "prioriza_bacias_node"}
+        for medida in nos.values():
+            assert medida["tempo_s"] >= 0 and medida["tempo_cpu_s"] >= 0
+            assert medida["sessao"] == "sessao_teste" and medida["pipeline"] == "__default__"
+
+        leituras = {(medida["nome"], medida["no"]) for medida in metricas if medida["tipo"] == "leitura"}
+        assert ("input_pre_processado", "prioriza_bacias_node") in leituras
+        gravacoes = {medida["nome"] for medida in metricas if medida["tipo"] == "gravacao"}
+        assert {"ranking_bacias", "bacias_priorizadas", "dataset_resumo"} <= gravacoes
+
+        # Um registro por ano e por fase, todos do prioriza_bacias
+        etapas = [medida for medida in metricas if medida["tipo"] == "etapa"]
+        assert {medida["no"] for medida in etapas} == {"prioriza_bacias_node"}
+        anos = sorted({medida["ano"] for medida in etapas})
+        for etapa in ["ano", "preparacao", "municipio", "bloco", "global"]:
+            assert sorted(medida["ano"] for medida in etapas if medida["nome"] == etapa) == anos
+
+    def test_no_gerador(self, executa):
+        metricas = executa(simulacao=create_pipeline_por_ano)
+
+        # A medida do nó gerador inclui a simulação de todos os anos, feita durante as gravações das partições
+        no, = [medida for medida in metricas if medida["tipo"] == "no" and medida["nome"] == "prioriza_bacias_por_ano_node"]
+        etapas = [medida for medida in metricas if medida["tipo"] == "etapa"]
+        gravacoes = [medida for medida in metricas if medida["tipo"] == "gravacao" and medida["no"] == no["nome"]]
+        anos = [medida for medida in etapas if medida["nome"] == "ano"]
+        assert {medida["no"] for medida in etapas} == {"prioriza_bacias_por_ano_node"}
+        # Três partições por ano do input; os anos a partir do ANO_INICIO_CAPEX (2) são simulados
+        assert len(gravacoes) == 3 * 4
+        assert sorted(medida["ano"] for medida in anos) == [2, 3]
+        assert no["tempo_s"] >= sum(medida["tempo_s"] for medida in anos)
+
+    @pytest.mark.parametrize("reinicia", [True, False])
+    def test_pico_de_memoria_por_no(self, tmp_path, monkeypatch, reinicia):
+        if not reinicia:
+            # Plataforma sem reinício do pico do processo: registra o incremento do pico
+            monkeypatch.setattr(hooks_metricas, "reinicia_pico_rss", lambda: False)
+
+        def grande(x):
+            # ~400 MB residentes, liberados ao fim do nó
+            return float(np.ones(50_000_000).sum()) + x
+
+        def pequeno(x):
+            return x + 1
+
+        catalogo = DataCatalog({"x": MemoryDataset(0.0)})
+        hooks = MetricasHooks(arquivo=str(tmp_path / "metricas.jsonl"))
+        hook_manager = _create_hook_manager()
+        hook_manager.register(hooks)
+        hooks.before_pipeline_run({"session_id": "sessao_teste", "pipeline_name": None})
+        SequentialRunner().run(pipeline([node(grande, "x", "y", name="grande"), node(pequeno, "y", "z", name="pequeno")]),
+                               catalogo, hook_manager)
+        hooks.after_pipeline_run()
+
+        linhas = (tmp_path / "metricas.jsonl").read_text(encoding="utf-8").splitlines()
+        nos = {medida["nome"]: medida for medida in map(json.loads, linhas) if medida["tipo"] == "no"}
+        # O pico do nó pequeno não herda o do grande
+        coluna = "pico_rss_mb" if reinicia and hooks_metricas.reinicia_pico_rss() else "incremento_pico_rss_mb"
+        assert set(nos["pequeno"]) & {"pico_rss_mb", "incremento_pico_rss_mb"} == {coluna}
+        assert nos["grande"][coluna] - nos["pequeno"][coluna] > 300
+
+    def test_sqlite(self, executa, tmp_path, monkeypatch):
+        from kedro.framework.project import settings
+
+        monkeypatch.setattr(settings, "SESSION_STORE_ARGS", {"path": str(tmp_path)})
+        metricas = executa(sqlite=True)
+
+        with sqlite3.connect(tmp_path / "session_store.db") as conexao:
+            n_linhas, = conexao.execute("SELECT COUNT(*) FROM metricas WHERE sessao = 'sessao_teste'").fetchone()
+        conexao.close()
+        assert n_linhas == len(metricas)
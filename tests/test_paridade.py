@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+from benchmarks.paridade import MOTORES, descreve, diferencas, diverge, verifica_paridade
+from priorizacao_capex.objects.utils.sintetico import gera_concessao
+from priorizacao_capex.pipelines.data_processing.nodes import calcula_ranking_bacias
+from priorizacao_capex.pipelines.model_priorization.simulador import simula_priorizacao
+
+
+@pytest.fixture
+def concessao():
+    return gera_concessao(n_bacias=40, n_municipios=5, n_blocos=2, n_anos=5, profundidade_predec=2, seed=1)
+
+
+def _motor_alterado(bacia, ano, delta):
+    def motor(df, ano_inicio_capex, threshold_tir, rastro):
+        df = simula_priorizacao(df, ano_inicio_capex, threshold_tir, rastro)
+        df.loc[(df["BACIA"] == bacia) & (df["ANO"] == ano), "P_IC_BAC_TOT"] += delta
+        return df
+    return motor
+
+
+class TestParidade:
+    def test_motor_em_arrays_igual_a_referencia(self, concessao):
+        relatorio = verifica_paridade(*concessao, motor="arrays", ranking_candidato=calcula_ranking_bacias)
+
+        assert not diverge(relatorio)
+        assert relatorio["ranking_bacias"].empty and relatorio["bacias_priorizadas"].empty
+        assert descreve(relatorio) == []
+
+    def test_diferenca_dentro_da_tolerancia_do_round_cols(self, concessao, monkeypatch):
+        monkeypatch.setitem(MOTORES, "alterado", _motor_alterado("B0003", 4, 0.0004))
+
+        assert not diverge(verifica_paridade(*concessao, motor="alterado"))
+
+    def test_aponta_primeira_bacia_ano_divergente(self, concessao, monkeypatch):
+        monkeypatch.setitem(MOTORES, "alterado", _motor_alterado("B0003", 4, 0.01))
+
+        relatorio = verifica_paridade(*concessao, motor="alterado")
+
+        assert diverge(relatorio)
+        assert relatorio["primeira_decisao"] is None
+        primeira = relatorio["primeira_bacia_ano"]
+        assert (primeira["BACIA"], primeira["ANO"], primeira["COLUNA"]) == ("B0003", 4, "P_IC_BAC_TOT")
+        assert primeira["CANDIDATO"] == pytest.approx(primeira["REFERENCIA"] + 0.01)
+
+    def test_aponta_primeira_decisao_divergente(self, concessao, monkeypatch):
+        # Com threshold_tir negativo, toda bacia habilitada é repriorizada e as decisões mudam
+        monkeypatch.setitem(MOTORES, "threshold_negativo", lambda df, ano, threshold_tir, rastro: simula_priorizacao(df, ano, -1.0, rastro))
+
+        relatorio = verifica_paridade(*concessao, motor="threshold_negativo")
+
+        decisao = relatorio["primeira_decisao"]
+        assert decisao is not None
+        assert decisao["referencia"] != decisao["candidato"]
+        assert any(linha.startswith("rastro: primeira decisão divergente") for linha in descreve(relatorio))
+
+    def test_ranking_candidato(self, concessao):
+        def ranking_trocado(input, parametros):
+            ranking_bacias = calcula_ranking_bacias(input, parametros)
+            ranking_bacias.loc[[0, 1], "RANK_GLOBAL"] = ranking_bacias.loc[[1, 0], "RANK_GLOBAL"].to_numpy()
+            return ranking_bacias
+
+        relatorio = verifica_paridade(*concessao, ranking_candidato=ranking_trocado)
+
+        assert relatorio["ranking_bacias"]["COLUNA"].tolist() == ["RANK_GLOBAL", "RANK_GLOBAL"]
+        assert relatorio["bacias_priorizadas"].empty
+
+
+def test_diferencas_linhas_ausentes():
+    referencia = pd.DataFrame({"BACIA": ["B1", "B2"], "ANO": [1, 1], "IC_BAC": [0.5, 0.6]})
+    candidato = pd.DataFrame({"BACIA": ["B1", "B3"], "ANO": [1, 1], "IC_BAC": [0.5, 0.6]})
+
+    resultado = diferencas(referencia, candidato, ["BACIA", "ANO"])
+
+    assert resultado[["BACIA", "COLUNA", "REFERENCIA", "CANDIDATO"]].values.tolist() == [
+        ["B2", "LINHA", "presente", "ausente"], ["B3", "LINHA", "ausente", "presente"]]